@@ -0,0 +1,23 @@
+import argparse
+from pathlib import Path
+
+from src.box import BoxType
+from src.coco.cache import build_image_cache
+from src.coco.dataset import CocoDataset
+
+
+def main(path: Path, images: Path, box: BoxType, dst: Path, size: int):
+	dataset = CocoDataset.load(path, box.to_cls())
+	build_image_cache(dataset, images, dst, size, prefix=path.stem)
+
+
+if __name__ == "__main__":
+	args = argparse.ArgumentParser()
+	args.add_argument("path", type=Path)
+	args.add_argument("images", type=Path)
+	args.add_argument("box", type=BoxType)
+	args.add_argument("dst", type=Path)
+	args.add_argument("--size", type=int, default=640)
+
+	args = args.parse_args()
+	main(args.path, args.images, args.box, args.dst, args.size)
@@ -1,16 +1,20 @@
 import argparse
 from pathlib import Path
 
-from src.box import LTWHAbsBox
-from src.coco.dataset import CocoDataset
+from src.box import BoxType
+from src.coco.columnar import ColumnarCocoDataset
+from src.coco.stream import split_coco
 
 
-def main(path: Path, ratio: float):
-	dataset = CocoDataset.load(path, LTWHAbsBox)
-
+def main(path: Path, ratio: float, stream: bool, cache: bool = True, cache_dir: Path | None = None):
 	train_path = path.parent / "train.json"
 	eval_path = path.parent / "eval.json"
 
+	if stream:
+		split_coco(path, ratio, train_path, eval_path)
+		return
+
+	dataset = ColumnarCocoDataset.load(path, BoxType.LTWH_ABS, cache, cache_dir)
 	train_dataset, eval_dataset = dataset.split(ratio)
 	train_dataset.save(train_path)
 	eval_dataset.save(eval_path)
@@ -20,6 +24,9 @@ if __name__ == "__main__":
 	args = argparse.ArgumentParser()
 	args.add_argument("path", type=Path)
 	args.add_argument("--ratio", type=float, default=0.8)
+	args.add_argument("--stream", action="store_true")
+	args.add_argument("--no-cache", action="store_true")
+	args.add_argument("--cache-dir", type=Path, default=None)
 
 	args = args.parse_args()
-	main(args.path, args.ratio)
+	main(args.path, args.ratio, args.stream, not args.no_cache, args.cache_dir)
@@ -1,50 +1,99 @@
 import argparse
-import torch
-
 from pathlib import Path
-from src.plate.detector import PlateDetector
-from src.plate.plate import draw_rect
-from src.util.dfine import dfine_handle_path
+from typing import TYPE_CHECKING
+
+from src.plate.render import render, frame_writer
+from src.util.files import output_path
+from src.util.shard import TarShardWriter, MemmapWriter
+from src.util.sink import Result, SinkType
+
+if TYPE_CHECKING:
+	from src.plate.detector import PlateDetector
 
 config = Path("model/DFINE/configs/dfine/custom/plate_detection_n.yml")
 checkpoint = Path("model/DFINE/output/dfine_hgnetv2_n_custom/last.pth")
 
 
-def prepare_detector(thresh: float) -> PlateDetector:
+def prepare_detector(
+	thresh: float, optimize: bool = False, bf16: bool = False, size: int | None = None,
+) -> "PlateDetector":
+	import torch
+	from src.plate.detector import PlateDetector
+
 	device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-	detector = PlateDetector(config, checkpoint, device, thresh)
+	detector = PlateDetector(config, checkpoint, device, thresh, size)
+	if optimize:
+		detector.optimize(bf16)
 	return detector
 
 
-def prepare_pipeline(src: Path, thresh: float, batch: int):
-	detector = prepare_detector(thresh)
+def prepare_pipeline(
+	src: Path, thresh: float, batch: int,
+	cache: Path | None = None, replay: bool = False, load_images: bool = True,
+	optimize: bool = False, bf16: bool = False, recursive: bool = False,
+):
+	from src.plate.detector import extract_plate
+	from src.util.dfine import dfine_handle_path, dfine_replay
+	from src.util.outputs import OutputStore, model_hash
 
-	for name, image, plate in dfine_handle_path(src, detector, batch):
-		if plate is None:
-			# print(f"Could not find plate in {name}")
-			continue
+	store = None
+	if cache is not None:
+		store = OutputStore(cache, model_hash(config, checkpoint))
 
-		yield name, image, plate
+	if replay:
+		if store is None:
+			raise ValueError("Replay requires a cache")
+		store.check(thresh)
+		extract = lambda labels, boxes, scores: extract_plate(boxes, scores, thresh)
+		results = dfine_replay(src, store, extract, load_images, recursive)
+	else:
+		detector = prepare_detector(thresh, optimize, bf16)
+		results = dfine_handle_path(src, detector, batch, store, recursive)
 
+	try:
+		for name, image, plate, elapsed in results:
+			if plate is None:
+				# print(f"Could not find plate in {name}")
+				continue
 
-def draw(dst: Path, pipeline):
-	for name, image, plate in pipeline:
-		draw_rect(image, plate)
-		image.save(dst / name)
+			yield name, image, plate, elapsed
+	finally:
+		if store is not None:
+			store.close()
 
 
-def label(dst: Path, pipeline):
-	for name, image, plate in pipeline:
-		name = Path(name).with_suffix(".txt")
-		with open(dst / name, "w") as f:
-			ltx, lty, rbx, rby = plate.coords()
-			f.write(f"0 {ltx} {lty} {rbx} {rby}\n")
+def draw(dst: Path, pipeline, scale: float = 1.0, video: Path | None = None, fps: float = 25):
+	with frame_writer(dst, video, fps) as writer:
+		for name, image, plate, _ in pipeline:
+			writer.write(name, render(image, rects=[plate], scale=scale))
+
+
+def label(dst: Path, pipeline, sink: SinkType, buffer: int):
+	with sink.to_cls()(dst, buffer) as sink:
+		for name, image, plate, elapsed in pipeline:
+			sink.write(Result(name=name, plate=plate, elapsed=elapsed))
 
 
 def crop(dst: Path, pipeline):
-	for name, image, plate in pipeline:
+	for name, image, plate, _ in pipeline:
 		image = image.crop(plate.coords())
-		image.save(dst / name)
+		image.save(output_path(dst, name))
+
+
+def crop_shards(dst: Path, pipeline, shard: str, shard_size: int):
+	match shard:
+		case "tar":
+			writer = TarShardWriter(dst, shard_size, prefix="crop")
+		case "memmap":
+			writer = MemmapWriter(dst, (256, 256), prefix="crop")
+		case _:
+			raise ValueError(f"Unknown shard format {shard}")
+
+	with writer:
+		for name, image, plate, _ in pipeline:
+			ltx, lty, rbx, rby = plate.coords()
+			image = image.crop((ltx, lty, rbx, rby))
+			writer.write(name, image, f"0 {ltx} {lty} {rbx} {rby}")
 
 
 if __name__ == "__main__":
@@ -52,22 +101,40 @@ if __name__ == "__main__":
 
 	subparsers = parser.add_subparsers(dest="command")
 	draw_parser = subparsers.add_parser("draw")
+	draw_parser.add_argument("--scale", type=float, default=1.0)
+	draw_parser.add_argument("--video", type=Path, default=None)
+	draw_parser.add_argument("--fps", type=float, default=25)
 	crop_parser = subparsers.add_parser("crop")
+	crop_parser.add_argument("--shard", choices=["tar", "memmap"], default=None)
+	crop_parser.add_argument("--shard-size", type=int, default=10000)
 	label_parser = subparsers.add_parser("label")
+	label_parser.add_argument("--sink", type=SinkType, default=SinkType.YOLO)
+	label_parser.add_argument("--buffer", type=int, default=1024)
 
 	parser.add_argument("src", type=Path)
 	parser.add_argument("dst", type=Path)
 	parser.add_argument("--batch", type=int, default=16)
+	parser.add_argument("--cache", type=Path, default=None)
+	parser.add_argument("--replay", action="store_true")
+	parser.add_argument("--optimize", action="store_true")
+	parser.add_argument("--bf16", action="store_true")
+	parser.add_argument("--recursive", action="store_true")
 	parser.add_argument("--thresh", type=float, default=0.9)
 
 	args = parser.parse_args()
 	args.dst.mkdir(exist_ok=True, parents=True)
-	pipeline = prepare_pipeline(args.src, args.thresh, args.batch)
+	pipeline = prepare_pipeline(
+		args.src, args.thresh, args.batch,
+		cache=args.cache, replay=args.replay, load_images=args.command != "label",
+		optimize=args.optimize, bf16=args.bf16, recursive=args.recursive,
+	)
 
 	match args.command:
 		case "draw":
-			draw(args.dst, pipeline)
+			draw(args.dst, pipeline, args.scale, args.video, args.fps)
 		case "label":
-			label(args.dst, pipeline)
-		case "crop":
+			label(args.dst, pipeline, args.sink, args.buffer)
+		case "crop" if args.shard is None:
 			crop(args.dst, pipeline)
+		case "crop":
+			crop_shards(args.dst, pipeline, args.shard, args.shard_size)
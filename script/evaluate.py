@@ -0,0 +1,89 @@
+import argparse
+import json
+from pathlib import Path
+
+from script.detect import prepare_detector
+from script import recognize
+from script.recognize import prepare_recognizer
+from src.plate.evaluate import evaluate_labels, evaluate_images, evaluate_sweep
+
+
+def sweep(args):
+	from src.util.outputs import OutputStore, model_hash
+
+	model = model_hash(recognize.config, recognize.checkpoint)
+	with OutputStore(args.src, model) as store:
+		evaluations = evaluate_sweep(store, args.thresh)
+
+	reports = []
+	for thresh, evaluation in zip(args.thresh, evaluations):
+		report = evaluation.report()
+		reports.append({"thresh": thresh, **report})
+		print(f"{thresh:.3f}", report["exact_match_rate"], report["character_error_rate"])
+
+	if args.report is not None:
+		with open(args.report, "w") as f:
+			json.dump(reports, f, indent=2)
+
+
+def main(args):
+	match args.command:
+		case "labels":
+			evaluation = evaluate_labels(args.src, args.workers)
+		case "images":
+			from src.plate.pipeline import PlatePipeline
+
+			detector = prepare_detector(args.detect_thresh)
+			recognizer = prepare_recognizer(args.recognize_thresh)
+			pipeline = PlatePipeline(detector, recognizer)
+			evaluation = evaluate_images(args.src, pipeline, args.batch, args.workers)
+		case "sweep":
+			return sweep(args)
+		case _:
+			raise ValueError(f"Unknown command {args.command}")
+
+	report = evaluation.report()
+	if args.report is not None:
+		with open(args.report, "w") as f:
+			json.dump(report, f, indent=2)
+
+	print("Total:", report["total"])
+	print("Exact match rate:", report["exact_match_rate"])
+	print("Character error rate:", report["character_error_rate"])
+	if "latency" in report:
+		print("Latency p50/p95/p99:", report["latency"]["p50"], report["latency"]["p95"], report["latency"]["p99"])
+	if "batch_latency" in report:
+		latency = report["batch_latency"]
+		print(
+			f"Batch latency (mean batch {latency['mean_batch']:.1f}) p50/p95/p99:",
+			latency["p50"], latency["p95"], latency["p99"],
+		)
+		print("Images per second:", latency["images_per_second"])
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+
+	common = argparse.ArgumentParser(add_help=False)
+	common.add_argument("src", type=Path)
+	common.add_argument("--report", type=Path, default=None)
+
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	labels_parser = subparsers.add_parser("labels", parents=[common])
+	labels_parser.add_argument("--workers", type=int, default=None)
+
+	images_parser = subparsers.add_parser("images", parents=[common])
+	images_parser.add_argument("--batch", type=int, default=16)
+	images_parser.add_argument("--workers", type=int, default=None)
+	images_parser.add_argument("--detect-thresh", type=float, default=0.9)
+	images_parser.add_argument("--recognize-thresh", type=float, default=0.5)
+
+	sweep_parser = subparsers.add_parser(
+		"sweep", parents=[common],
+		help="sweeps the recognizer threshold over raw outputs cached by recognize.py --cache, "
+		"thresholds below the cache floor (0.01) are rejected as they would not match a live run",
+	)
+	sweep_parser.add_argument("--thresh", type=float, nargs="+", required=True)
+
+	args = parser.parse_args()
+	main(args)
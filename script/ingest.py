@@ -0,0 +1,56 @@
+import argparse
+import json
+from pathlib import Path
+
+from src.util.dedup import DedupIndex, DedupStats, dedup_key
+from src.util.sink import SinkType
+
+
+def main(args):
+	from script import detect, recognize
+	from script.detect import prepare_detector
+	from script.recognize import prepare_recognizer
+	from src.plate.pipeline import PlatePipeline, dedup_handle_path
+	from src.util.outputs import model_hash
+
+	detector = prepare_detector(args.detect_thresh)
+	recognizer = prepare_recognizer(args.recognize_thresh)
+	pipeline = PlatePipeline(detector, recognizer)
+
+	# Changing a checkpoint or a threshold starts a fresh set of results in the same index
+	model = dedup_key(
+		[model_hash(detect.config, detect.checkpoint), model_hash(recognize.config, recognize.checkpoint)],
+		[args.detect_thresh, args.recognize_thresh],
+	)
+
+	stats = DedupStats()
+	with DedupIndex(args.index, model) as index, args.sink.to_cls()(args.dst, args.buffer) as sink:
+		for result in dedup_handle_path(args.src, pipeline, args.batch, index, stats, args.chunk):
+			sink.write(result)
+
+	report = stats.report()
+	print("Total:", report["total"])
+	print("Duplicates:", report["duplicates"], f"({(report['duplicate_ratio'] or 0) * 100:.1f}%)")
+	print(f"Hashing took {report['hash_time']:.2f}s, saved {report['saved_time']:.2f}s of model time")
+
+	if args.report is not None:
+		with open(args.report, "w") as f:
+			json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("src", type=Path)
+	parser.add_argument("dst", type=Path)
+	parser.add_argument("--index", type=Path, default=Path("dedup.sqlite"))
+	parser.add_argument("--sink", type=SinkType, default=SinkType.JSONL)
+	parser.add_argument("--buffer", type=int, default=1024)
+	parser.add_argument("--batch", type=int, default=16)
+	parser.add_argument("--chunk", type=int, default=1024)
+	parser.add_argument("--detect-thresh", type=float, default=0.9)
+	parser.add_argument("--recognize-thresh", type=float, default=0.5)
+	parser.add_argument("--report", type=Path, default=None)
+
+	args = parser.parse_args()
+	args.dst.mkdir(exist_ok=True, parents=True)
+	main(args)
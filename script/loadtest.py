@@ -0,0 +1,122 @@
+import argparse
+import json
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+from src.util.load import Payloads, image_files, run_load, find_saturation, InProcessTarget, HttpTarget, ScheduledTarget
+
+
+def prepare_target(
+	url: str | None, detect_thresh: float, recognize_thresh: float,
+	schedule: bool = False, deadline: float | None = None,
+):
+	if url is not None:
+		return HttpTarget(url), None
+
+	from script.detect import prepare_detector
+	from script.recognize import prepare_recognizer
+	from src.plate.pipeline import PlatePipeline
+	from src.plate.scheduler import Scheduler
+
+	detector = prepare_detector(detect_thresh)
+	recognizer = prepare_recognizer(recognize_thresh)
+	pipeline = PlatePipeline(detector, recognizer)
+	if not schedule:
+		return InProcessTarget(pipeline), None
+
+	scheduler = Scheduler(pipeline)
+	return ScheduledTarget(scheduler, deadline=deadline), scheduler
+
+
+def submit_backfill(scheduler, src: Path, window: int = 64):
+	from src.plate.scheduler import Priority
+
+	# Backfill only runs on capacity left over by live requests, so images are decoded as the scheduler
+	# drains them and at most window of them are queued at a time
+	slots = threading.BoundedSemaphore(window)
+
+	def feed():
+		for file in image_files(src):
+			slots.acquire()
+			image = Image.open(file).convert("RGB")
+			try:
+				future = scheduler.submit(image, Priority.BACKFILL)
+			except RuntimeError:
+				# The scheduler was closed, the rest of the backfill is dropped
+				return
+			future.add_done_callback(lambda _: slots.release())
+
+	threading.Thread(target=feed, daemon=True).start()
+
+
+def print_report(report):
+	print(
+		f"rate {report.rate:8.2f}/s  throughput {report.throughput:8.2f}/s  "
+		f"p50 {report.latency_p50 * 1000:7.1f}ms  p95 {report.latency_p95 * 1000:7.1f}ms  "
+		f"p99 {report.latency_p99 * 1000:7.1f}ms  queue p95 {report.queue_p95 * 1000:7.1f}ms  "
+		f"cpu {report.process_cpu * 100:5.1f}%  errors {report.errors}"
+	)
+
+
+def main(args):
+	payloads = Payloads(args.src)
+	if len(payloads) == 0:
+		raise ValueError(f"No images in {args.src}")
+
+	slo = args.slo / 1000
+	if args.schedule and args.url is not None:
+		raise ValueError("Scheduling is only available for the in-process target")
+	if args.backfill is not None and not args.schedule:
+		raise ValueError("Backfill requires --schedule")
+	target, scheduler = prepare_target(args.url, args.detect_thresh, args.recognize_thresh, args.schedule, slo)
+
+	# Warm-up, so that lazy initialization does not end up in the first percentiles
+	for i in range(min(args.concurrency, len(payloads))):
+		target(payloads[i])
+
+	if args.backfill is not None:
+		submit_backfill(scheduler, args.backfill)
+
+	if args.saturate:
+		rate, reports = find_saturation(target, payloads, slo, args.duration, args.concurrency, args.rate)
+		for report in reports:
+			print_report(report)
+		print("Saturation rate:", rate)
+		result = {"saturation_rate": rate, "slo": slo, "runs": [r.to_dict() for r in reports]}
+	else:
+		report = run_load(target, payloads, args.rate, args.duration, args.concurrency)
+		print_report(report)
+		result = report.to_dict()
+
+	if scheduler is not None:
+		# Backfill that did not fit into the run is dropped
+		scheduler.close(cancel=True)
+		stats = scheduler.stats.report()
+		result = {"load": result, "scheduler": stats}
+		for priority in ("live", "backfill"):
+			print(f"{priority}: completed {stats[priority]['completed']}  missed deadlines {stats[priority]['missed_deadlines']}")
+
+	if args.report is not None:
+		with open(args.report, "w") as f:
+			json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("src", type=Path)
+	parser.add_argument("--url", type=str, default=None)
+	parser.add_argument("--rate", type=float, default=1.0)
+	parser.add_argument("--duration", type=float, default=30.0)
+	parser.add_argument("--concurrency", type=int, default=4)
+	parser.add_argument("--slo", type=float, default=300.0)
+	parser.add_argument("--saturate", action="store_true")
+	parser.add_argument("--schedule", action="store_true")
+	parser.add_argument("--backfill", type=Path, default=None)
+	parser.add_argument("--detect-thresh", type=float, default=0.9)
+	parser.add_argument("--recognize-thresh", type=float, default=0.5)
+	parser.add_argument("--report", type=Path, default=None)
+
+	args = parser.parse_args()
+	main(args)
@@ -6,6 +6,8 @@ from PIL import Image
 from script.detect import prepare_detector
 from script.recognize import prepare_recognizer
 from src.plate.plate import Plate, draw_plate
+from src.plate.roi import open_roi
+from src.util.sink import SinkType
 
 
 def main(path: Path, detect_thresh: float, recognize_thresh: float):
@@ -33,11 +35,47 @@ def main(path: Path, detect_thresh: float, recognize_thresh: float):
 			break
 
 
+def label(
+	path: Path, dst: Path, detect_thresh: float, recognize_thresh: float,
+	sink: SinkType, batch: int, recursive: bool = False,
+	roi_path: Path | None = None, learn_roi: bool = False, roi_size: int | None = None,
+):
+	from src.plate.pipeline import PlatePipeline, pipeline_handle_batches
+
+	detector = prepare_detector(detect_thresh, size=roi_size)
+	recognizer = prepare_recognizer(recognize_thresh)
+	roi = open_roi(roi_path, learn_roi)
+	pipeline = PlatePipeline(detector, recognizer, roi)
+
+	# Results stay in array form from the models all the way into the sink
+	with sink.to_cls()(dst) as sink:
+		for plates in pipeline_handle_batches(path, pipeline, batch, recursive):
+			sink.write_batch(plates)
+
+	if roi is not None and roi_path is not None:
+		roi.save(roi_path)
+
+
 if __name__ == "__main__":
 	parser = argparse.ArgumentParser()
 	parser.add_argument("path", type=Path)
 	parser.add_argument("detect_thresh", type=float)
 	parser.add_argument("recognize_thresh", type=float)
 
+	parser.add_argument("--dst", type=Path, default=None)
+	parser.add_argument("--sink", type=SinkType, default=SinkType.YOLO)
+	parser.add_argument("--batch", type=int, default=16)
+	parser.add_argument("--recursive", action="store_true")
+	parser.add_argument("--roi", type=Path, default=None)
+	parser.add_argument("--learn-roi", action="store_true")
+	parser.add_argument("--roi-size", type=int, default=None)
+
 	args = parser.parse_args()
-	main(args.path, args.detect_thresh, args.recognize_thresh)
+	if args.dst is None:
+		main(args.path, args.detect_thresh, args.recognize_thresh)
+	else:
+		args.dst.mkdir(exist_ok=True, parents=True)
+		label(
+			args.path, args.dst, args.detect_thresh, args.recognize_thresh, args.sink, args.batch, args.recursive,
+			args.roi, args.learn_roi, args.roi_size,
+		)
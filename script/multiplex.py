@@ -0,0 +1,63 @@
+import argparse
+import json
+from pathlib import Path
+
+from src.plate.multiplex import Multiplexer, open_source
+from src.plate.roi import open_roi
+from src.util.sink import Result, SinkType
+
+
+def main(args):
+	from script.detect import prepare_detector
+	from script.recognize import prepare_recognizer
+	from src.plate.pipeline import PlatePipeline
+
+	detector = prepare_detector(args.detect_thresh, size=args.roi_size)
+	recognizer = prepare_recognizer(args.recognize_thresh)
+	roi = open_roi(args.roi, args.learn_roi)
+	pipeline = PlatePipeline(detector, recognizer, roi)
+
+	sources = [open_source(path, args.fps, args.buffer) for path in args.sources]
+	multiplexer = Multiplexer(sources, pipeline, args.batch)
+
+	with args.sink.to_cls()(args.dst, args.sink_buffer) as sink:
+		for frame, plate in multiplexer:
+			sink.write(Result(
+				name=f"{frame.source}_{frame.index:06d}.jpg",
+				plate=plate.rect if plate is not None else None,
+				symbols=plate.symbols if plate is not None else None,
+			))
+
+	if roi is not None and args.roi is not None:
+		roi.save(args.roi)
+
+	report = multiplexer.report()
+	for name, stats in report.items():
+		lag = stats["lag_p95"]
+		lag = f"{lag * 1000:.1f}ms" if lag is not None else "-"
+		print(f"{name}: read {stats['read']}  processed {stats['processed']}  dropped {stats['dropped']}  lag p95 {lag}")
+
+	if args.report is not None:
+		with open(args.report, "w") as f:
+			json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("sources", type=Path, nargs="+")
+	parser.add_argument("--dst", type=Path, required=True)
+	parser.add_argument("--fps", type=float, default=None)
+	parser.add_argument("--buffer", type=int, default=4)
+	parser.add_argument("--batch", type=int, default=16)
+	parser.add_argument("--sink", type=SinkType, default=SinkType.JSONL)
+	parser.add_argument("--sink-buffer", type=int, default=1024)
+	parser.add_argument("--roi", type=Path, default=None)
+	parser.add_argument("--learn-roi", action="store_true")
+	parser.add_argument("--roi-size", type=int, default=None)
+	parser.add_argument("--detect-thresh", type=float, default=0.9)
+	parser.add_argument("--recognize-thresh", type=float, default=0.5)
+	parser.add_argument("--report", type=Path, default=None)
+
+	args = parser.parse_args()
+	args.dst.mkdir(exist_ok=True, parents=True)
+	main(args)
@@ -0,0 +1,79 @@
+import argparse
+import copy
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+from src.util.files import IMAGE_EXTENSIONS
+
+if TYPE_CHECKING:
+	import torch
+
+
+def load_images(src: Path, transform, count: int) -> "torch.Tensor":
+	import torch
+
+	files = sorted(
+		file
+		for file in src.iterdir()
+		if file.is_file() and file.suffix.lower() in IMAGE_EXTENSIONS
+	)
+	if len(files) == 0:
+		raise ValueError(f"No images in {src}")
+
+	# Images are repeated when the folder is smaller than the largest batch
+	images = [transform(Image.open(files[i % len(files)]).convert("RGB")) for i in range(count)]
+	return torch.stack(images, 0)
+
+
+def main(args):
+	import torch
+	from src.util.compile import compare, PINNED_BATCHES
+
+	batches = args.batches or list(PINNED_BATCHES)
+	match args.model:
+		case "detector":
+			from script.detect import prepare_detector
+			model = prepare_detector(0.5)
+		case "recognizer":
+			from script.recognize import prepare_recognizer
+			model = prepare_recognizer(0.5)
+		case _:
+			raise ValueError(f"Unknown model {args.model}")
+
+	eager = copy.deepcopy(model.model)
+	model.optimize(args.bf16, not args.no_compile, batches)
+
+	images = load_images(args.src, model.transform, max(batches)).to(model.device)
+	sizes = torch.tensor([[model.size, model.size]] * images.size(0), device=model.device)
+
+	reports = []
+	for batch in batches:
+		report = compare(eager, model.model, images[:batch], sizes[:batch], args.repeats)
+		reports.append(report)
+		print(
+			f"batch {report['batch']:3d}  eager {report['eager_ms']:8.1f}ms  "
+			f"optimized {report['optimized_ms']:8.1f}ms  speedup {report['speedup']:5.2f}x  "
+			f"score drift {report['score_drift']:.4f}  box drift {report['box_drift']:.4f}  "
+			f"label agreement {report['label_agreement'] * 100:5.1f}%"
+		)
+
+	if args.report is not None:
+		with open(args.report, "w") as f:
+			json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("src", type=Path)
+	parser.add_argument("--model", choices=["detector", "recognizer"], default="detector")
+	parser.add_argument("--batches", type=int, nargs="+", default=None)
+	parser.add_argument("--repeats", type=int, default=10)
+	parser.add_argument("--bf16", action="store_true")
+	parser.add_argument("--no-compile", action="store_true")
+	parser.add_argument("--report", type=Path, default=None)
+
+	args = parser.parse_args()
+	main(args)
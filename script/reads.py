@@ -0,0 +1,94 @@
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+from src.plate.reads import ReadStore
+from src.util.sink import Result
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_DATETIME = 0x0132
+
+
+def capture_time(path: Path) -> float | None:
+	# EXIF capture time if the camera wrote one, file modification time otherwise
+	try:
+		with Image.open(path) as image:
+			exif = image.getexif()
+	except FileNotFoundError:
+		return None
+	except Exception:
+		exif = {}
+
+	value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) if exif else None
+	value = value or (exif.get(EXIF_DATETIME) if exif else None)
+	if value:
+		try:
+			return datetime.strptime(value.strip("\x00 "), "%Y:%m:%d %H:%M:%S").timestamp()
+		except ValueError:
+			pass
+	return path.stat().st_mtime
+
+
+def add(store: ReadStore, src: Path, source: str | None, images: Path | None):
+	# JSONL output of the label commands. A "time" field wins, then the capture time of the image under
+	# images, reads with neither are stamped with the time they are added
+	count = 0
+	unstamped = 0
+	with open(src) as f:
+		for line in f:
+			result = json.loads(line)
+			timestamp = result.get("time")
+			if timestamp is None and images is not None:
+				timestamp = capture_time(images / result["name"])
+			unstamped += timestamp is None
+
+			store.add_result(Result.from_dict(result), timestamp, source or src.stem)
+			count += 1
+	print(f"Added {count} results from {src}")
+	if unstamped:
+		print(f"{unstamped} results have no capture time and were stamped with the current time, pass --images")
+
+
+def find(store: ReadStore, text: str, distance: int, since: datetime | None, until: datetime | None, limit: int):
+	start = since.timestamp() if since is not None else None
+	end = until.timestamp() if until is not None else None
+
+	if distance == 0:
+		matches = [(read, 0) for read in store.exact(text, start, end, limit)]
+	else:
+		matches = store.fuzzy(text, distance, start, end, limit)
+
+	for read, d in matches:
+		timestamp = datetime.fromtimestamp(read.time).isoformat(sep=" ", timespec="seconds")
+		print(f"{timestamp}  {read.text:12s}  distance {d}  source {read.source}")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("store", type=Path)
+
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	add_parser = subparsers.add_parser("add")
+	add_parser.add_argument("src", type=Path, nargs="+")
+	add_parser.add_argument("--source", type=str, default=None)
+	add_parser.add_argument("--images", type=Path, default=None)
+
+	find_parser = subparsers.add_parser("find")
+	find_parser.add_argument("text", type=str)
+	find_parser.add_argument("--distance", type=int, default=0)
+	find_parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+	find_parser.add_argument("--until", type=datetime.fromisoformat, default=None)
+	find_parser.add_argument("--limit", type=int, default=100)
+
+	args = parser.parse_args()
+	with ReadStore(args.store) as store:
+		match args.command:
+			case "add":
+				for src in args.src:
+					add(store, src, args.source, args.images)
+			case "find":
+				find(store, args.text, args.distance, args.since, args.until, args.limit)
@@ -1,47 +1,73 @@
 import argparse
-import torch
-
 from pathlib import Path
-from src.plate.plate import draw_symbols
-from src.plate.recognizer import PlateRecognizer
-from src.util.dfine import dfine_handle_path
+from typing import TYPE_CHECKING
+
+from src.plate.render import render, frame_writer
+from src.util.sink import Result, SinkType
+
+if TYPE_CHECKING:
+	from src.plate.recognizer import PlateRecognizer
 
 config = Path("model/DFINE/configs/dfine/custom/plate_recognition_n.yml")
 checkpoint = Path("model/DFINE/output/plate_recognition_n_7/best_stg1.pth")
 
 
-def prepare_recognizer(thresh: float) -> PlateRecognizer:
+def prepare_recognizer(thresh: float, optimize: bool = False, bf16: bool = False) -> "PlateRecognizer":
+	import torch
+	from src.plate.recognizer import PlateRecognizer
+
 	device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 	recognizer = PlateRecognizer(config, checkpoint, device, thresh)
+	if optimize:
+		recognizer.optimize(bf16)
 	return recognizer
 
 
-def prepare_pipeline(src: Path, thresh: float, batch: int):
-	recognizer = prepare_recognizer(thresh)
+def prepare_pipeline(
+	src: Path, thresh: float, batch: int,
+	cache: Path | None = None, replay: bool = False, load_images: bool = True,
+	optimize: bool = False, bf16: bool = False, recursive: bool = False,
+):
+	from src.plate.recognizer import extract_symbols
+	from src.util.dfine import dfine_handle_path, dfine_replay
+	from src.util.outputs import OutputStore, model_hash
+
+	store = None
+	if cache is not None:
+		store = OutputStore(cache, model_hash(config, checkpoint))
 
-	for name, image, symbols in dfine_handle_path(src, recognizer, batch):
-		if symbols is None or len(symbols) == 0:
-			# print(f"Could recognize symbols in {name}")
-			continue
+	if replay:
+		if store is None:
+			raise ValueError("Replay requires a cache")
+		store.check(thresh)
+		extract = lambda labels, boxes, scores: extract_symbols(labels, boxes, scores, thresh)
+		results = dfine_replay(src, store, extract, load_images, recursive)
+	else:
+		recognizer = prepare_recognizer(thresh, optimize, bf16)
+		results = dfine_handle_path(src, recognizer, batch, store, recursive)
 
-		yield name, image, symbols
+	try:
+		for name, image, symbols, elapsed in results:
+			if symbols is None or len(symbols) == 0:
+				# print(f"Could recognize symbols in {name}")
+				continue
 
+			yield name, image, symbols, elapsed
+	finally:
+		if store is not None:
+			store.close()
 
-def draw(dst: Path, pipeline):
-	for name, image, symbols in pipeline:
-		draw_symbols(image, symbols)
-		image.save(dst / name)
 
+def draw(dst: Path, pipeline, scale: float = 1.0, video: Path | None = None, fps: float = 25):
+	with frame_writer(dst, video, fps) as writer:
+		for name, image, symbols, _ in pipeline:
+			writer.write(name, render(image, rects=[symbol.rect for symbol in symbols], scale=scale))
 
-def label(dst: Path, pipeline):
-	for name, image, symbols in pipeline:
-		name = Path(name).with_suffix(".txt")
 
-		with open(dst / name, "w") as f:
-			for symbol in symbols:
-				cls = symbol.id
-				ltx, lty, rbx, rby = symbol.rect.coords()
-				f.write(f"{cls} {ltx} {lty} {rbx} {rby}\n")
+def label(dst: Path, pipeline, sink: SinkType, buffer: int):
+	with sink.to_cls()(dst, buffer) as sink:
+		for name, image, symbols, elapsed in pipeline:
+			sink.write(Result(name=name, symbols=symbols, elapsed=elapsed))
 
 
 if __name__ == "__main__":
@@ -49,19 +75,33 @@ if __name__ == "__main__":
 
 	subparsers = parser.add_subparsers(dest="command")
 	draw_parser = subparsers.add_parser("draw")
+	draw_parser.add_argument("--scale", type=float, default=1.0)
+	draw_parser.add_argument("--video", type=Path, default=None)
+	draw_parser.add_argument("--fps", type=float, default=25)
 	label_parser = subparsers.add_parser("label")
+	label_parser.add_argument("--sink", type=SinkType, default=SinkType.YOLO)
+	label_parser.add_argument("--buffer", type=int, default=1024)
 
 	parser.add_argument("src", type=Path)
 	parser.add_argument("dst", type=Path)
 	parser.add_argument("--batch", type=int, default=16)
+	parser.add_argument("--cache", type=Path, default=None)
+	parser.add_argument("--replay", action="store_true")
+	parser.add_argument("--optimize", action="store_true")
+	parser.add_argument("--bf16", action="store_true")
+	parser.add_argument("--recursive", action="store_true")
 	parser.add_argument("--thresh", type=float, default=0.5)
 
 	args = parser.parse_args()
 	args.dst.mkdir(exist_ok=True, parents=True)
-	pipeline = prepare_pipeline(args.src, args.thresh, args.batch)
+	pipeline = prepare_pipeline(
+		args.src, args.thresh, args.batch,
+		cache=args.cache, replay=args.replay, load_images=args.command != "label",
+		optimize=args.optimize, bf16=args.bf16, recursive=args.recursive,
+	)
 
 	match args.command:
 		case "draw":
-			draw(args.dst, pipeline)
+			draw(args.dst, pipeline, args.scale, args.video, args.fps)
 		case "label":
-			label(args.dst, pipeline)
+			label(args.dst, pipeline, args.sink, args.buffer)
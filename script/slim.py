@@ -0,0 +1,39 @@
+import argparse
+import json
+from pathlib import Path
+
+
+def main(args):
+	from src.util.slim import slim_checkpoint
+
+	match args.model:
+		case "detector":
+			from script.detect import config, checkpoint
+		case "recognizer":
+			from script.recognize import config, checkpoint
+		case _:
+			raise ValueError(f"Unknown model {args.model}")
+
+	config = args.config or config
+	checkpoint = args.checkpoint or checkpoint
+	dst = args.dst or checkpoint.with_name(f"{checkpoint.stem}_deploy_{args.dtype}.pth")
+
+	manifest = slim_checkpoint(config, checkpoint, dst, args.dtype)
+	print(json.dumps(manifest, indent=2))
+	print(
+		f"{checkpoint} ({manifest['checkpoint_bytes'] / 2**20:.1f} MiB) -> "
+		f"{dst} ({manifest['bytes'] / 2**20:.1f} MiB), "
+		f"{manifest['bytes'] / manifest['checkpoint_bytes'] * 100:.1f}% of the original"
+	)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--model", choices=["detector", "recognizer"], default="detector")
+	parser.add_argument("--config", type=Path, default=None)
+	parser.add_argument("--checkpoint", type=Path, default=None)
+	parser.add_argument("--dst", type=Path, default=None)
+	parser.add_argument("--dtype", choices=["fp32", "fp16", "bf16"], default="fp16")
+
+	args = parser.parse_args()
+	main(args)
@@ -0,0 +1,113 @@
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+MODULES = [
+	"src.box",
+	"src.coco.dataset",
+	"src.coco.columnar",
+	"src.coco.stream",
+	"src.coco.cache",
+	"src.plate.evaluate",
+	"src.util.sink",
+	"src.util.shard",
+	"src.plate.detector",
+	"src.plate.recognizer",
+]
+
+SCRIPTS = [
+	"script.cococache",
+	"script.cocosplit",
+	"script.yolo2coco",
+	"script.detect",
+	"script.recognize",
+	"script.evaluate",
+	"script.main",
+	"script.loadtest",
+	"script.optimize",
+]
+
+HEAVY = ["torch", "torchvision", "model.DFINE"]
+
+PROBE = """
+import sys
+from time import perf_counter
+start = perf_counter()
+import {module}
+elapsed = perf_counter() - start
+print(elapsed, *[any(m == h or m.startswith(h + ".") for m in sys.modules) for h in {heavy!r}])
+"""
+
+
+def measure_import(module: str, repeats: int) -> dict:
+	# Every sample runs in a fresh interpreter, otherwise everything after the first import is cached
+	times = []
+	for _ in range(repeats):
+		output = subprocess.run(
+			[sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+			capture_output=True, text=True, check=True,
+		).stdout.split()
+		times.append(float(output[0]))
+
+	return {
+		"module": module,
+		"median_ms": float(np.median(times)) * 1000,
+		"max_ms": float(np.max(times)) * 1000,
+		"heavy": [h for h, loaded in zip(HEAVY, output[1:]) if loaded == "True"],
+	}
+
+
+def measure_help(script: str, repeats: int) -> dict:
+	times = []
+	for _ in range(repeats):
+		start = perf_counter()
+		subprocess.run([sys.executable, "-m", script, "--help"], capture_output=True, check=True)
+		times.append(perf_counter() - start)
+
+	return {
+		"script": script,
+		"median_ms": float(np.median(times)) * 1000,
+		"max_ms": float(np.max(times)) * 1000,
+	}
+
+
+def main(args):
+	modules = []
+	for module in args.modules or MODULES:
+		try:
+			result = measure_import(module, args.repeats)
+		except subprocess.CalledProcessError:
+			print(f"{module:24s} failed to import")
+			continue
+		modules.append(result)
+		print(f"{module:24s} {result['median_ms']:8.1f}ms  heavy: {', '.join(result['heavy']) or '-'}")
+
+	scripts = []
+	for script in args.scripts or SCRIPTS:
+		try:
+			result = measure_help(script, args.repeats)
+		except subprocess.CalledProcessError:
+			print(f"{script + ' --help':24s} failed")
+			continue
+		scripts.append(result)
+		print(f"{script + ' --help':24s} {result['median_ms']:8.1f}ms")
+
+	if args.report is not None:
+		with open(args.report, "w") as f:
+			json.dump({"modules": modules, "scripts": scripts}, f, indent=2)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--modules", type=str, nargs="+", default=None)
+	parser.add_argument("--scripts", type=str, nargs="+", default=None)
+	parser.add_argument("--repeats", type=int, default=5)
+	parser.add_argument("--report", type=Path, default=None)
+
+	args = parser.parse_args()
+	main(args)
@@ -1,19 +1,24 @@
 import argparse
-from collections import defaultdict
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple
 
 from PIL import Image
 from tqdm import tqdm
 
-from src.box import AnnotatedBox, BoxType
+import numpy as np
+
+from src.box import BoxArray, BoxType
 from src.coco.annotation import CocoAnnotation
 from src.coco.category import CocoCategory
-from src.coco.dataset import CocoDataset, CocoDatasetInfo
+from src.coco.dataset import CocoDatasetInfo
 from src.coco.image import CocoImage
+from src.coco.stream import CocoWriter
+from src.util.files import is_image
+from src.util.imsize import read_image_size
+from src.util.parallel import bounded_map
 
-IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png"]
 BBOX_LIMIT = 100
 
 
@@ -21,138 +26,128 @@ BBOX_LIMIT = 100
 class Item:
 	image_name: str = None
 	image_size: Tuple[int, int] = None
-	bboxes: List[AnnotatedBox] = None
+	classes: np.ndarray = None
+	bboxes: BoxArray = None
 
 
 def decode_image_size(path: Path):
 	try:
+		size = read_image_size(path)
+		if size is not None:
+			return size
+
+		# Unknown or unusual header layout, let PIL figure it out
 		with Image.open(path) as image:
 			return image.size
 	except Exception:
 		print(f"Failed to decode image size: {path}")
 
 
-def load_bboxes(path: Path, box_cls):
+def load_bboxes(path: Path, box_type: BoxType):
 	try:
-		with open(path) as file:
-			bboxes = [AnnotatedBox.from_str(line, box_cls) for line in file]
-			return bboxes
+		return BoxArray.load_yolo(path, box_type)
 	except Exception:
 		print(f"Failed to load bboxes: {path}")
 
 
-def load_yolo_dataset(labels: Path, images: Path, box_cls):
-	items = defaultdict(Item)
+def load_item(task: Tuple[Path, Path, BoxType, BoxType]) -> Item | None:
+	label, image, src_box, dst_box = task
+
+	bboxes = load_bboxes(label, src_box)
+	if bboxes is None:
+		return None
 
-	for file in tqdm(labels.iterdir(), "Labels"):
-		if file.suffix.lower() != ".txt":
-			continue
+	size = decode_image_size(image)
+	if size is None:
+		return None
 
-		bboxes = load_bboxes(file, box_cls)
-		if bboxes is None:
-			continue
+	classes, bboxes = bboxes
+	bboxes = bboxes.to(dst_box, *size)
+	return Item(image_name=image.name, image_size=size, classes=classes, bboxes=bboxes)
 
-		item = items[file.stem]
-		item.bboxes = bboxes
 
-	for file in tqdm(images.iterdir(), "Images"):
-		if file.suffix.lower() not in IMAGE_EXTENSIONS:
-			continue
+def load_yolo_dataset(labels: Path, images: Path, src_box: BoxType, dst_box: BoxType, workers: int | None = None):
+	# Only image names are kept in memory, items are produced and consumed one by one
+	image_names = {}
+	for entry in tqdm(os.scandir(images), "Images"):
+		stem, ext = os.path.splitext(entry.name)
+		if is_image(entry.name):
+			image_names[stem] = entry.name
 
-		item = items.get(file.stem)
-		if item is None:
-			continue
+	def tasks():
+		for entry in os.scandir(labels):
+			stem, ext = os.path.splitext(entry.name)
+			if ext.lower() != ".txt":
+				continue
 
-		size = decode_image_size(file)
-		if size is None:
-			continue
+			image_name = image_names.get(stem)
+			if image_name is None:
+				continue
 
-		item.image_name = file.name
-		item.image_size = size
+			yield Path(entry.path), images / image_name, src_box, dst_box
 
-	items = [
-		item
-		for item in items.values()
-		if item.image_name is not None
-	]
-	return items
+	for item in bounded_map(load_item, tasks(), workers):
+		if item is not None:
+			yield item
 
 
 def main(
 	src_labels: Path, src_images: Path, src_box: BoxType,
 	dst: Path, dst_box: BoxType,
-	indent: bool,
+	indent: bool, workers: int | None,
 ):
 	dst.mkdir(
 		exist_ok=True,
 		parents=True,
 	)
 
-	src_box_cls = src_box.to_cls()
-	dst_box_cls = dst_box.to_cls()
+	yolo_dataset = load_yolo_dataset(src_labels, src_images, src_box, dst_box, workers)
 
-	yolo_dataset = load_yolo_dataset(src_labels, src_images, src_box_cls)
-	print(f"Loaded {len(yolo_dataset)} Yolo items")
-
-	coco_images = list()
-	coco_annotations = list()
-	coco_categories = set()
-
-	for i, item in tqdm(enumerate(yolo_dataset), "Converting"):
-		if len(item.bboxes) == 0:
-			# print(f"No bboxes found for: {item.image_name}")
-			continue
-
-		if len(item.bboxes) > BBOX_LIMIT:
-			raise RuntimeError(f"Too many bboxes ({len(item.bboxes)}): {item.image_name}")
-
-		categories = (bbox.cls for bbox in item.bboxes)
-		coco_categories.update(categories)
-
-		image = CocoImage(
-			id=i,
-			file_name=item.image_name,
-			width=item.image_size[0],
-			height=item.image_size[1],
-		)
-		coco_images.append(image)
-
-		annotations = []
-		for j, annotated in enumerate(item.bboxes):
-			bbox = annotated.box.to(dst_box_cls, image.width, image.height)
-			annotation = CocoAnnotation(
-				id=i * BBOX_LIMIT + j,
-				image_id=i,
-				category_id=annotated.cls,
-				bbox=bbox,
-				area=bbox.area()
-			)
-			annotations.append(annotation)
-		coco_annotations += annotations
-
-	categories = "0123456789ABEKMHOPCTYX"
-	coco_categories = [
-		CocoCategory(
-			id=category,
-			name=categories[category],
-		)
-		for category in coco_categories
-	]
-
-	coco_dataset = CocoDataset(
-		info=CocoDatasetInfo(
-			year=2024,
-			version="1.0.0",
-			description="Description",
-		),
-		images=coco_images,
-		annotations=coco_annotations,
-		categories=coco_categories,
+	info = CocoDatasetInfo(
+		year=2024,
+		version="1.0.0",
+		description="Description",
 	)
+	coco_categories = set()
 
-	print("Saving")
 	dataset_path = dst / "dataset.json"
-	coco_dataset.save(dataset_path, 2 if indent else None)
+	with CocoWriter(dataset_path, info, 2 if indent else None) as writer:
+		for i, item in tqdm(enumerate(yolo_dataset), "Converting"):
+			if len(item.bboxes) == 0:
+				# print(f"No bboxes found for: {item.image_name}")
+				continue
+
+			if len(item.bboxes) > BBOX_LIMIT:
+				raise RuntimeError(f"Too many bboxes ({len(item.bboxes)}): {item.image_name}")
+
+			classes = item.classes.tolist()
+			coco_categories.update(classes)
+
+			image = CocoImage(
+				id=i,
+				file_name=item.image_name,
+				width=item.image_size[0],
+				height=item.image_size[1],
+			)
+			writer.write_image(image)
+
+			areas = item.bboxes.area().tolist()
+			for j, (cls, bbox, area) in enumerate(zip(classes, item.bboxes, areas)):
+				annotation = CocoAnnotation(
+					id=i * BBOX_LIMIT + j,
+					image_id=i,
+					category_id=cls,
+					bbox=bbox,
+					area=area,
+				)
+				writer.write_annotation(annotation)
+
+		categories = "0123456789ABEKMHOPCTYX"
+		for category in sorted(coco_categories):
+			writer.write_category(CocoCategory(
+				id=category,
+				name=categories[category],
+			))
 
 
 if __name__ == "__main__":
@@ -163,6 +158,7 @@ if __name__ == "__main__":
 	args.add_argument("dst", type=Path)
 	args.add_argument("dst_box", type=BoxType)
 	args.add_argument("--indent", type=bool, default=False)
+	args.add_argument("--workers", type=int, default=None)
 
 	args = args.parse_args()
-	main(args.src_labels, args.src_images, args.src_box, args.dst, args.dst_box, args.indent)
+	main(args.src_labels, args.src_images, args.src_box, args.dst, args.dst_box, args.indent, args.workers)
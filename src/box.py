@@ -1,8 +1,10 @@
 from abc import abstractmethod
-from copy import copy
 from dataclasses import dataclass
 from enum import StrEnum
-from typing import List
+from pathlib import Path
+from typing import ClassVar, List, Tuple
+
+import numpy as np
 
 
 class BoxType(StrEnum):
@@ -23,22 +25,37 @@ class BoxType(StrEnum):
 			case BoxType.LTRB_REL:
 				return LTRBRelBox
 
+	def is_rel(self) -> bool:
+		return self in (BoxType.LTWH_REL, BoxType.LTRB_REL)
+
+	def is_ltwh(self) -> bool:
+		return self in (BoxType.LTWH_ABS, BoxType.LTWH_REL)
+
+	@staticmethod
+	def of(ltwh: bool, rel: bool) -> "BoxType":
+		if ltwh:
+			return BoxType.LTWH_REL if rel else BoxType.LTWH_ABS
+		return BoxType.LTRB_REL if rel else BoxType.LTRB_ABS
+
 
 @dataclass
 class Box:
-	@staticmethod
+	# Concrete box classes set their BoxType, conversions and IoU of single boxes go through BoxArray
+	type: ClassVar[BoxType]
+
+	@classmethod
 	@abstractmethod
-	def from_str(s: str) -> "Box":
+	def from_str(cls, s: str) -> "Box":
 		pass
 
-	@staticmethod
+	@classmethod
 	@abstractmethod
-	def from_coords(l: List[float]) -> "Box":
+	def from_coords(cls, l: List[float]) -> "Box":
 		pass
 
-	@staticmethod
+	@classmethod
 	@abstractmethod
-	def __from_box__(bbox: "Box") -> "Box":
+	def __from_box__(cls, bbox: "Box") -> "Box":
 		pass
 
 	@abstractmethod
@@ -60,13 +77,14 @@ class Box:
 	def area(self):
 		return self.width() * self.height()
 
-	def to(self, cls, img_w: int, img_h: int):
-		box = self
-		if isinstance(box, AbsBox) and issubclass(cls, RelBox):
-			box = box.to_rel(img_w, img_h)
-		elif isinstance(box, RelBox) and issubclass(cls, AbsBox):
-			box = box.to_abs(img_w, img_h)
-		return cls.__from_box__(box)
+	def to_array(self) -> "BoxArray":
+		return BoxArray(np.array(self.coords(), dtype=np.float64), self.type)
+
+	def to(self, cls, img_w: int | None = None, img_h: int | None = None):
+		return self.to_array().to(cls.type, img_w, img_h)[0]
+
+	def iou(self, other: "Box") -> float:
+		return float(self.to_array().iou(other.to_array())[0, 0])
 
 
 @dataclass
@@ -103,27 +121,21 @@ class LTWHBox(Box):
 	w: float
 	h: float
 
-	@staticmethod
-	def from_str(s: str) -> "Box":
+	@classmethod
+	def from_str(cls, s: str) -> "Box":
 		coords = s.split(" ", maxsplit=3)
 		coords = (float(coord) for coord in coords)
-		return LTWHBox(*coords)
+		return cls(*coords)
 
-	@staticmethod
-	def from_coords(l: List[float]) -> "Box":
-		return LTWHBox(*l)
+	@classmethod
+	def from_coords(cls, l: List[float]) -> "Box":
+		return cls(*l)
 
-	@staticmethod
-	def __from_box__(box: "Box") -> "LTWHBox":
-		if isinstance(box, LTWHBox):
-			return copy(box)
-		if isinstance(box, LTRBBox):
-			return LTWHBox(
-				ltx=box.ltx,
-				lty=box.lty,
-				w=box.rbx - box.ltx,
-				h=box.rby - box.lty,
-			)
+	@classmethod
+	def __from_box__(cls, box: "Box") -> "LTWHBox":
+		# Only the layout changes, the box stays absolute or relative
+		coords = box.to_array().to(BoxType.of(True, box.type.is_rel())).coords[0]
+		return cls(*coords.tolist())
 
 	def coords(self):
 		return [self.ltx, self.lty, self.w, self.h]
@@ -142,27 +154,21 @@ class LTRBBox(Box):
 	rbx: float
 	rby: float
 
-	@staticmethod
-	def from_str(s: str) -> "Box":
+	@classmethod
+	def from_str(cls, s: str) -> "Box":
 		coords = s.split(" ", maxsplit=3)
 		coords = (float(coord) for coord in coords)
-		return LTRBBox(*coords)
+		return cls(*coords)
 
-	@staticmethod
-	def from_coords(l: List[float]) -> "Box":
-		return LTRBBox(*l)
+	@classmethod
+	def from_coords(cls, l: List[float]) -> "Box":
+		return cls(*l)
 
-	@staticmethod
-	def __from_box__(box: "Box") -> "LTRBBox":
-		if isinstance(box, LTWHBox):
-			return LTRBBox(
-				ltx=box.ltx,
-				lty=box.lty,
-				rbx=box.ltx + box.w,
-				rby=box.lty + box.h,
-			)
-		if isinstance(box, LTRBBox):
-			return copy(box)
+	@classmethod
+	def __from_box__(cls, box: "Box") -> "LTRBBox":
+		# Only the layout changes, the box stays absolute or relative
+		coords = box.to_array().to(BoxType.of(False, box.type.is_rel())).coords[0]
+		return cls(*coords.tolist())
 
 	def coords(self):
 		return [self.ltx, self.lty, self.rbx, self.rby]
@@ -176,43 +182,135 @@ class LTRBBox(Box):
 
 @dataclass
 class LTWHAbsBox(LTWHBox, AbsBox):
+	type: ClassVar[BoxType] = BoxType.LTWH_ABS
+
 	def to_rel(self, img_w: int, img_h: int) -> "LTWHRelBox":
-		return LTWHRelBox(
-			ltx=self.ltx / img_w,
-			lty=self.lty / img_h,
-			w=self.w / img_w,
-			h=self.h / img_h,
-		)
+		return self.to(LTWHRelBox, img_w, img_h)
 
 
 @dataclass
 class LTWHRelBox(LTWHBox, RelBox):
+	type: ClassVar[BoxType] = BoxType.LTWH_REL
+
 	def to_abs(self, img_w: int, img_h: int) -> "LTWHAbsBox":
-		return LTWHAbsBox(
-			ltx=self.ltx * img_w,
-			lty=self.lty * img_h,
-			w=self.w * img_w,
-			h=self.h * img_h,
-		)
+		return self.to(LTWHAbsBox, img_w, img_h)
 
 
 @dataclass
 class LTRBAbsBox(LTRBBox, AbsBox):
+	type: ClassVar[BoxType] = BoxType.LTRB_ABS
+
 	def to_rel(self, img_w: int, img_h: int) -> "LTRBRelBox":
-		return LTRBRelBox(
-			ltx=self.ltx / img_w,
-			lty=self.lty / img_h,
-			rbx=self.rbx / img_w,
-			rby=self.rby / img_h,
-		)
+		return self.to(LTRBRelBox, img_w, img_h)
 
 
 @dataclass
 class LTRBRelBox(LTRBBox, RelBox):
+	type: ClassVar[BoxType] = BoxType.LTRB_REL
+
 	def to_abs(self, img_w: int, img_h: int) -> "LTRBAbsBox":
-		return LTRBAbsBox(
-			ltx=self.ltx * img_w,
-			lty=self.lty * img_h,
-			rbx=self.rbx * img_w,
-			rby=self.rby * img_h,
-		)
+		return self.to(LTRBAbsBox, img_w, img_h)
+
+
+class BoxArray:
+	def __init__(self, coords: np.ndarray, box_type: BoxType):
+		self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 4)
+		self.type = box_type
+
+	@staticmethod
+	def from_boxes(boxes: List[Box], box_type: BoxType) -> "BoxArray":
+		coords = [box.coords() for box in boxes]
+		return BoxArray(np.array(coords, dtype=np.float64), box_type)
+
+	@staticmethod
+	def from_str(s: str, box_type: BoxType) -> Tuple[np.ndarray, "BoxArray"]:
+		values = np.array(s.split(), dtype=np.float64).reshape(-1, 5)
+		classes = values[:, 0].astype(np.int64)
+		return classes, BoxArray(values[:, 1:], box_type)
+
+	@staticmethod
+	def load_yolo(path: Path, box_type: BoxType) -> Tuple[np.ndarray, "BoxArray"]:
+		with open(path) as f:
+			return BoxArray.from_str(f.read(), box_type)
+
+	def __len__(self):
+		return len(self.coords)
+
+	def __getitem__(self, idx):
+		# A single index gives a scalar box holding a copy of the row, slices stay arrays sharing the data
+		if isinstance(idx, (int, np.integer)):
+			return self.type.to_cls()(*self.coords[idx].tolist())
+		return BoxArray(self.coords[idx], self.type)
+
+	def __iter__(self):
+		for idx in range(len(self)):
+			yield self[idx]
+
+	@staticmethod
+	def __scale__(img_w, img_h) -> np.ndarray:
+		# None would broadcast into NaN boxes instead of failing
+		if img_w is None or img_h is None:
+			raise ValueError("Image size is required to scale boxes between relative and absolute")
+
+		# Scalars give a (4,) scale, per-box arrays of image sizes give (N, 4)
+		return np.stack(np.broadcast_arrays(img_w, img_h, img_w, img_h), axis=-1).astype(np.float64)
+
+	def ltrb(self) -> np.ndarray:
+		coords = self.coords.copy()
+		if self.type.is_ltwh():
+			coords[:, 2:] += coords[:, :2]
+		return coords
+
+	def to(self, box_type: BoxType, img_w=None, img_h=None) -> "BoxArray":
+		coords = self.coords.copy()
+
+		if self.type.is_rel() and not box_type.is_rel():
+			coords *= self.__scale__(img_w, img_h)
+		elif not self.type.is_rel() and box_type.is_rel():
+			coords /= self.__scale__(img_w, img_h)
+
+		if self.type.is_ltwh() and not box_type.is_ltwh():
+			coords[:, 2:] += coords[:, :2]
+		elif not self.type.is_ltwh() and box_type.is_ltwh():
+			coords[:, 2:] -= coords[:, :2]
+
+		return BoxArray(coords, box_type)
+
+	def width(self) -> np.ndarray:
+		if self.type.is_ltwh():
+			return self.coords[:, 2]
+		return self.coords[:, 2] - self.coords[:, 0]
+
+	def height(self) -> np.ndarray:
+		if self.type.is_ltwh():
+			return self.coords[:, 3]
+		return self.coords[:, 3] - self.coords[:, 1]
+
+	def area(self) -> np.ndarray:
+		return self.width() * self.height()
+
+	def clip(self, img_w=None, img_h=None) -> "BoxArray":
+		coords = self.ltrb()
+		if self.type.is_rel():
+			coords = np.clip(coords, 0, 1)
+		else:
+			coords = np.clip(coords, 0, self.__scale__(img_w, img_h))
+
+		if self.type.is_ltwh():
+			coords[:, 2:] -= coords[:, :2]
+		return BoxArray(coords, self.type)
+
+	def iou(self, other: "BoxArray") -> np.ndarray:
+		if self.type.is_rel() != other.type.is_rel():
+			raise ValueError(f"Can not compare {self.type} and {other.type} boxes")
+
+		a = self.ltrb()[:, None, :]
+		b = other.ltrb()[None, :, :]
+
+		lt = np.maximum(a[..., :2], b[..., :2])
+		rb = np.minimum(a[..., 2:], b[..., 2:])
+		wh = np.clip(rb - lt, 0, None)
+		inter = wh[..., 0] * wh[..., 1]
+
+		union = self.area()[:, None] + other.area()[None, :] - inter
+		return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
@@ -0,0 +1,43 @@
+from collections import defaultdict
+from pathlib import Path
+
+from PIL import Image
+from tqdm import tqdm
+
+from src.box import LTWHAbsBox
+from src.coco.dataset import CocoDataset
+from src.util.shard import MemmapWriter
+
+
+def build_image_cache(dataset: CocoDataset, images: Path, dst: Path, size: int, prefix: str = "cache"):
+	annotations = defaultdict(list)
+	for annotation in dataset.annotations:
+		annotations[annotation.image_id].append(annotation)
+
+	dst.mkdir(exist_ok=True, parents=True)
+	with MemmapWriter(dst, (size, size), prefix) as writer:
+		for image in tqdm(dataset.images, "Caching"):
+			try:
+				with Image.open(images / image.file_name) as file:
+					pixels = file.convert("RGB")
+			except Exception:
+				print(f"Failed to decode image: {image.file_name}")
+				continue
+
+			sx = size / image.width
+			sy = size / image.height
+
+			boxes = []
+			for annotation in annotations[image.id]:
+				bbox = annotation.bbox.to(LTWHAbsBox, image.width, image.height)
+				boxes.append({
+					"category_id": annotation.category_id,
+					"bbox": [bbox.ltx * sx, bbox.lty * sy, bbox.w * sx, bbox.h * sy],
+				})
+
+			writer.write(image.file_name, pixels, {
+				"id": image.id,
+				"width": image.width,
+				"height": image.height,
+				"annotations": boxes,
+			})
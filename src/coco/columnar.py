@@ -0,0 +1,273 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from src.box import BoxArray, BoxType
+from src.coco.annotation import CocoAnnotation
+from src.coco.category import CocoCategory
+from src.coco.dataset import CocoDataset, CocoDatasetInfo
+from src.coco.image import CocoImage
+from src.coco.stream import CocoWriter
+
+CACHE_VERSION = 2
+
+
+@dataclass
+class ColumnarCocoDataset:
+	info: CocoDatasetInfo
+	categories: List[CocoCategory]
+	box_type: BoxType
+
+	# Images, in the order of the source document
+	image_ids: np.ndarray
+	file_names: np.ndarray
+	widths: np.ndarray
+	heights: np.ndarray
+
+	# Annotations, grouped by image: the ones of image k are [offsets[k], offsets[k + 1]).
+	# Annotations of images missing from the dataset follow after offsets[-1], with their own image ids
+	ids: np.ndarray
+	category_ids: np.ndarray
+	bboxes: np.ndarray
+	areas: np.ndarray
+	offsets: np.ndarray
+	orphan_image_ids: np.ndarray
+
+	def __post_init__(self):
+		self.image_order = np.argsort(self.image_ids, kind="stable")
+
+	@property
+	def annotation_image_ids(self) -> np.ndarray:
+		counts = np.diff(self.offsets)
+		return np.concatenate([np.repeat(self.image_ids, counts), self.orphan_image_ids])
+
+	def image_index(self, image_id: int) -> int:
+		i = np.searchsorted(self.image_ids, image_id, sorter=self.image_order)
+		if i >= len(self.image_ids) or self.image_ids[self.image_order[i]] != image_id:
+			raise KeyError(f"Unknown image {image_id}")
+		return int(self.image_order[i])
+
+	def annotation_range(self, image_id: int) -> Tuple[int, int]:
+		k = self.image_index(image_id)
+		return int(self.offsets[k]), int(self.offsets[k + 1])
+
+	def image_annotations(self, image_id: int) -> Tuple[np.ndarray, np.ndarray, BoxArray]:
+		start, end = self.annotation_range(image_id)
+		bboxes = BoxArray(self.bboxes[start:end], self.box_type)
+		return self.ids[start:end], self.category_ids[start:end], bboxes
+
+	def __slice__(self, start: int, end: int, orphans: bool = False) -> "ColumnarCocoDataset":
+		ann_start, ann_end = self.offsets[start], self.offsets[end]
+		if orphans:
+			ann_end = len(self.ids)
+		return ColumnarCocoDataset(
+			info=self.info,
+			categories=self.categories,
+			box_type=self.box_type,
+			image_ids=self.image_ids[start:end],
+			file_names=self.file_names[start:end],
+			widths=self.widths[start:end],
+			heights=self.heights[start:end],
+			ids=self.ids[ann_start:ann_end],
+			category_ids=self.category_ids[ann_start:ann_end],
+			bboxes=self.bboxes[ann_start:ann_end],
+			areas=self.areas[ann_start:ann_end],
+			offsets=self.offsets[start:end + 1] - ann_start,
+			orphan_image_ids=self.orphan_image_ids if orphans else self.orphan_image_ids[:0],
+		)
+
+	def split(self, ratio: float) -> Tuple["ColumnarCocoDataset", "ColumnarCocoDataset"]:
+		# Annotations of unknown images are not part of the train images, so they go to eval as in CocoDataset.split
+		n = int(len(self.image_ids) * ratio)
+		return self.__slice__(0, n), self.__slice__(n, len(self.image_ids), orphans=True)
+
+	@staticmethod
+	def from_json(data: dict, box_type: BoxType) -> "ColumnarCocoDataset":
+		images = data["images"]
+		image_ids = np.fromiter((image["id"] for image in images), dtype=np.int64, count=len(images))
+		file_names = np.array([image["file_name"] for image in images], dtype=np.str_)
+		widths = np.fromiter((image["width"] for image in images), dtype=np.int32, count=len(images))
+		heights = np.fromiter((image["height"] for image in images), dtype=np.int32, count=len(images))
+
+		annotations = data["annotations"]
+		count = len(annotations)
+		ids = np.fromiter((a["id"] for a in annotations), dtype=np.int64, count=count)
+		ann_image_ids = np.fromiter((a["image_id"] for a in annotations), dtype=np.int64, count=count)
+		category_ids = np.fromiter((a["category_id"] for a in annotations), dtype=np.int64, count=count)
+		areas = np.fromiter((a["area"] for a in annotations), dtype=np.float64, count=count)
+		bboxes = np.array([a["bbox"] for a in annotations], dtype=np.float64).reshape(-1, 4)
+
+		# Annotations are grouped in image order, the ones of unknown images are kept at the end
+		if len(image_ids) > 0:
+			image_order = np.argsort(image_ids, kind="stable")
+			positions = np.searchsorted(image_ids, ann_image_ids, sorter=image_order)
+			positions = np.minimum(positions, len(image_ids) - 1)
+			known = image_ids[image_order[positions]] == ann_image_ids
+			positions = image_order[positions[known]]
+		else:
+			known = np.zeros(count, dtype=bool)
+			positions = np.zeros(0, dtype=np.int64)
+
+		order = np.argsort(positions, kind="stable")
+		positions = positions[order]
+		offsets = np.searchsorted(positions, np.arange(len(image_ids) + 1))
+
+		def group(values: np.ndarray) -> np.ndarray:
+			return np.concatenate([values[known][order], values[~known]])
+
+		return ColumnarCocoDataset(
+			info=CocoDatasetInfo(**data["info"]),
+			categories=[CocoCategory(**category) for category in data["categories"]],
+			box_type=box_type,
+			image_ids=image_ids,
+			file_names=file_names,
+			widths=widths,
+			heights=heights,
+			ids=group(ids),
+			category_ids=group(category_ids),
+			bboxes=group(bboxes),
+			areas=group(areas),
+			offsets=offsets.astype(np.int64),
+			orphan_image_ids=ann_image_ids[~known],
+		)
+
+	@staticmethod
+	def from_dataset(dataset: CocoDataset, box_type: BoxType) -> "ColumnarCocoDataset":
+		data = {
+			"info": dataset.info.__dict__,
+			"images": [image.__dict__ for image in dataset.images],
+			"annotations": [
+				{**annotation.__dict__, "bbox": annotation.bbox.coords()}
+				for annotation in dataset.annotations
+			],
+			"categories": [category.__dict__ for category in dataset.categories],
+		}
+		return ColumnarCocoDataset.from_json(data, box_type)
+
+	def to_dataset(self) -> CocoDataset:
+		box_cls = self.box_type.to_cls()
+		images = [
+			CocoImage(id=id, file_name=file_name, width=width, height=height)
+			for id, file_name, width, height in zip(
+				self.image_ids.tolist(), self.file_names.tolist(), self.widths.tolist(), self.heights.tolist()
+			)
+		]
+		annotations = [
+			CocoAnnotation(id=id, image_id=image_id, category_id=category_id, bbox=box_cls(*bbox), area=area)
+			for id, image_id, category_id, bbox, area in zip(
+				self.ids.tolist(), self.annotation_image_ids.tolist(), self.category_ids.tolist(),
+				self.bboxes.tolist(), self.areas.tolist()
+			)
+		]
+		return CocoDataset(info=self.info, images=images, annotations=annotations, categories=self.categories)
+
+	def save(self, file: Path, indent: int | None = None):
+		with CocoWriter(file, self.info, indent) as writer:
+			for id, file_name, width, height in zip(
+				self.image_ids.tolist(), self.file_names.tolist(), self.widths.tolist(), self.heights.tolist()
+			):
+				writer.write_image({"id": id, "file_name": file_name, "width": width, "height": height})
+
+			for id, image_id, category_id, bbox, area in zip(
+				self.ids.tolist(), self.annotation_image_ids.tolist(), self.category_ids.tolist(),
+				self.bboxes.tolist(), self.areas.tolist()
+			):
+				writer.write_annotation({
+					"id": id, "image_id": image_id, "category_id": category_id, "bbox": bbox, "area": area,
+				})
+
+			for category in self.categories:
+				writer.write_category(category)
+
+	@staticmethod
+	def cache_path(file: Path, cache_dir: Path | None = None) -> Path:
+		if cache_dir is None:
+			return file.with_name(file.name + ".npz")
+
+		# Datasets are usually all called dataset.json, so the source path tells them apart in a shared directory
+		digest = hashlib.blake2b(str(file.resolve()).encode(), digest_size=8).hexdigest()
+		return cache_dir / f"{file.name}.{digest}.npz"
+
+	def save_cache(self, file: Path, source: Path):
+		stat = source.stat()
+		meta = {
+			"version": CACHE_VERSION,
+			"source_size": stat.st_size,
+			"source_mtime": stat.st_mtime_ns,
+			"box_type": str(self.box_type),
+			"info": self.info.__dict__,
+			"categories": [category.__dict__ for category in self.categories],
+		}
+
+		# Written next to the final path and renamed, so a crashed write never leaves a broken cache
+		tmp = file.with_name(file.name + ".tmp.npz")
+		np.savez(
+			tmp,
+			meta=np.array(json.dumps(meta)),
+			image_ids=self.image_ids,
+			file_names=self.file_names,
+			widths=self.widths,
+			heights=self.heights,
+			ids=self.ids,
+			category_ids=self.category_ids,
+			bboxes=self.bboxes,
+			areas=self.areas,
+			offsets=self.offsets,
+			orphan_image_ids=self.orphan_image_ids,
+		)
+		tmp.replace(file)
+
+	@staticmethod
+	def load_cache(file: Path, source: Path, box_type: BoxType) -> "ColumnarCocoDataset | None":
+		if not file.exists():
+			return None
+
+		with np.load(file) as arrays:
+			meta = json.loads(arrays["meta"].item())
+			stat = source.stat()
+			if (
+				meta["version"] != CACHE_VERSION
+				or meta["source_size"] != stat.st_size
+				or meta["source_mtime"] != stat.st_mtime_ns
+				or meta["box_type"] != str(box_type)
+			):
+				return None
+
+			return ColumnarCocoDataset(
+				info=CocoDatasetInfo(**meta["info"]),
+				categories=[CocoCategory(**category) for category in meta["categories"]],
+				box_type=box_type,
+				image_ids=arrays["image_ids"],
+				file_names=arrays["file_names"],
+				widths=arrays["widths"],
+				heights=arrays["heights"],
+				ids=arrays["ids"],
+				category_ids=arrays["category_ids"],
+				bboxes=arrays["bboxes"],
+				areas=arrays["areas"],
+				offsets=arrays["offsets"],
+				orphan_image_ids=arrays["orphan_image_ids"],
+			)
+
+	@staticmethod
+	def load(
+		file: Path, box_type: BoxType, cache: bool = True, cache_dir: Path | None = None,
+	) -> "ColumnarCocoDataset":
+		cache_file = ColumnarCocoDataset.cache_path(file, cache_dir)
+		if cache:
+			dataset = ColumnarCocoDataset.load_cache(cache_file, file, box_type)
+			if dataset is not None:
+				return dataset
+
+		with open(file, "r") as f:
+			data = json.load(f)
+		dataset = ColumnarCocoDataset.from_json(data, box_type)
+
+		if cache:
+			cache_file.parent.mkdir(parents=True, exist_ok=True)
+			dataset.save_cache(cache_file, file)
+		return dataset
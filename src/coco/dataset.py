@@ -3,10 +3,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Tuple
 
-from src.box import Box
 from src.coco.annotation import CocoAnnotation
 from src.coco.category import CocoCategory
 from src.coco.image import CocoImage
+from src.coco.stream import CocoWriter
 
 
 @dataclass
@@ -23,15 +23,14 @@ class CocoDataset:
 	annotations: List[CocoAnnotation]
 	categories: List[CocoCategory]
 
-	@staticmethod
-	def json_serializer(obj):
-		if isinstance(obj, Box):
-			return obj.coords()
-		return obj.__dict__
-
 	def save(self, file: Path, indent: int | None = None):
-		with open(file, "w") as f:
-			json.dump(self, f, default=self.json_serializer, indent=indent)
+		with CocoWriter(file, self.info, indent) as writer:
+			for image in self.images:
+				writer.write_image(image)
+			for annotation in self.annotations:
+				writer.write_annotation(annotation)
+			for category in self.categories:
+				writer.write_category(category)
 
 	@staticmethod
 	def load(file: Path, box_cls) -> "CocoDataset":
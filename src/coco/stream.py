@@ -0,0 +1,248 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+from src.box import Box
+
+
+def coco_record(obj) -> dict:
+	if isinstance(obj, dict):
+		return obj
+
+	record = dict(obj.__dict__)
+	if isinstance(record.get("bbox"), Box):
+		record["bbox"] = record["bbox"].coords()
+	return record
+
+
+class CocoWriter:
+	def __init__(self, file: Path, info, indent: int | None = None):
+		self.file = file
+		self.indent = indent
+		self.separator = ",\n" if indent is not None else ","
+
+		# COCO keeps images and annotations in separate arrays, while producers emit them interleaved.
+		# Images go straight to the output, annotations are spooled and appended on close
+		# The output is only moved into place once it is complete, a failed run leaves no partial dataset behind
+		self.spool_path = file.with_name(file.name + ".annotations.tmp")
+		self.out_path = file.with_name(file.name + ".tmp")
+		self.out = open(self.out_path, "w", buffering=1 << 20)
+		self.spool = open(self.spool_path, "w+", buffering=1 << 20)
+
+		self.categories = {}
+		self.images = 0
+		self.annotations = 0
+
+		info = json.dumps(coco_record(info), indent=indent)
+		self.out.write(f'{{"info": {info}, "images": [')
+
+	def __dumps__(self, obj) -> str:
+		return json.dumps(coco_record(obj), indent=self.indent)
+
+	def write_image(self, image):
+		if self.images > 0:
+			self.out.write(self.separator)
+		self.out.write(self.__dumps__(image))
+		self.images += 1
+
+	def write_annotation(self, annotation):
+		if self.annotations > 0:
+			self.spool.write(self.separator)
+		self.spool.write(self.__dumps__(annotation))
+		self.annotations += 1
+
+	def write_category(self, category):
+		category = coco_record(category)
+		self.categories[category["id"]] = category
+
+	def close(self):
+		if self.out.closed:
+			return
+
+		self.out.write('], "annotations": [')
+		self.spool.seek(0)
+		shutil.copyfileobj(self.spool, self.out, 1 << 20)
+		self.spool.close()
+		self.spool_path.unlink()
+
+		categories = self.separator.join(self.__dumps__(c) for c in self.categories.values())
+		self.out.write(f'], "categories": [{categories}]}}')
+		self.out.close()
+		os.replace(self.out_path, self.file)
+
+	def abort(self):
+		if self.out.closed:
+			return
+
+		self.spool.close()
+		self.out.close()
+		self.spool_path.unlink(missing_ok=True)
+		self.out_path.unlink(missing_ok=True)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		if exc_type is not None:
+			self.abort()
+		else:
+			self.close()
+
+
+class JsonStream:
+	WHITESPACE = " \t\n\r"
+
+	def __init__(self, f, chunk: int = 1 << 20):
+		self.f = f
+		self.chunk = chunk
+		self.decoder = json.JSONDecoder()
+
+		self.buf = ""
+		self.pos = 0
+		self.eof = False
+
+	def __fill__(self):
+		data = self.f.read(self.chunk)
+		if not data:
+			self.eof = True
+		self.buf = self.buf[self.pos:] + data
+		self.pos = 0
+
+	def peek(self) -> str:
+		while True:
+			while self.pos < len(self.buf) and self.buf[self.pos] in self.WHITESPACE:
+				self.pos += 1
+			if self.pos < len(self.buf):
+				return self.buf[self.pos]
+			if self.eof:
+				return ""
+			self.__fill__()
+
+	def expect(self, char: str):
+		if self.peek() != char:
+			raise ValueError(f"Expected '{char}' at {self.pos}")
+		self.pos += 1
+
+	def value(self):
+		self.peek()
+		while True:
+			try:
+				value, end = self.decoder.raw_decode(self.buf, self.pos)
+				# A number may continue in the next chunk, so it is only complete when followed by something
+				if end < len(self.buf) or self.eof:
+					self.pos = end
+					return value
+			except json.JSONDecodeError:
+				if self.eof:
+					raise
+			self.__fill__()
+
+	def items(self):
+		self.expect("[")
+		if self.peek() == "]":
+			self.pos += 1
+			return
+
+		while True:
+			yield self.value()
+			char = self.peek()
+			self.pos += 1
+			if char == "]":
+				return
+			if char != ",":
+				raise ValueError(f"Expected ',' or ']' at {self.pos}")
+
+	def members(self):
+		# Yields keys only, the caller consumes each value with value() or items() before resuming
+		self.expect("{")
+		if self.peek() == "}":
+			self.pos += 1
+			return
+
+		while True:
+			key = self.value()
+			self.expect(":")
+			yield key
+
+			char = self.peek()
+			self.pos += 1
+			if char == "}":
+				return
+			if char != ",":
+				raise ValueError(f"Expected ',' or '}}' at {self.pos}")
+
+
+def iter_coco(file: Path, *sections: str):
+	with open(file, "r") as f:
+		stream = JsonStream(f)
+		for key in stream.members():
+			if stream.peek() == "[":
+				for item in stream.items():
+					if key in sections:
+						yield key, item
+			else:
+				value = stream.value()
+				if key in sections:
+					yield key, value
+
+
+class IdSet:
+	# Bitmap over non-negative integer ids, an eighth of a byte per id instead of a set entry.
+	# Negative or very large ids would wrap around or blow up the bitmap, so they go to a plain set
+	def __init__(self, limit: int = 1 << 27):
+		self.limit = limit
+		self.bits = bytearray()
+		self.other = set()
+
+	def add(self, id: int):
+		if not 0 <= id < self.limit:
+			self.other.add(id)
+			return
+
+		byte = id >> 3
+		if byte >= len(self.bits):
+			self.bits.extend(bytes(max(byte + 1 - len(self.bits), len(self.bits))))
+		self.bits[byte] |= 1 << (id & 7)
+
+	def __contains__(self, id: int) -> bool:
+		if not 0 <= id < self.limit:
+			return id in self.other
+
+		byte = id >> 3
+		return byte < len(self.bits) and bool(self.bits[byte] & (1 << (id & 7)))
+
+
+def split_coco(file: Path, ratio: float, train_file: Path, eval_file: Path, indent: int | None = None):
+	info = None
+	categories = []
+	count = 0
+	for section, record in iter_coco(file, "info", "images", "categories"):
+		match section:
+			case "info":
+				info = record
+			case "images":
+				count += 1
+			case "categories":
+				categories.append(record)
+
+	n = int(count * ratio)
+	train_ids = IdSet()
+
+	with CocoWriter(train_file, info, indent) as train_writer, CocoWriter(eval_file, info, indent) as eval_writer:
+		for i, (_, image) in enumerate(iter_coco(file, "images")):
+			if i < n:
+				train_ids.add(image["id"])
+				train_writer.write_image(image)
+			else:
+				eval_writer.write_image(image)
+
+		for _, annotation in iter_coco(file, "annotations"):
+			if annotation["image_id"] in train_ids:
+				train_writer.write_annotation(annotation)
+			else:
+				eval_writer.write_annotation(annotation)
+
+		for category in categories:
+			train_writer.write_category(category)
+			eval_writer.write_category(category)
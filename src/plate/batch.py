@@ -0,0 +1,245 @@
+from dataclasses import dataclass
+from typing import Iterator, List
+
+import numpy as np
+
+from src.plate.plate import Rect, Symbol, SYMBOLS_EN
+from src.util.sink import Result
+
+
+def decode_table(alphabet: str) -> np.ndarray:
+	return np.array([ord(symbol) for symbol in alphabet], dtype=np.uint32)
+
+
+def optional(value: float) -> float | None:
+	return None if value != value else value
+
+
+def empty_symbols() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	return np.empty(0, dtype=np.uint8), np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32)
+
+
+@dataclass
+class PlateBatch:
+	names: List[str]
+	# Per plate, missing values are NaN and the masks tell a missing plate from missing symbols
+	found: np.ndarray
+	recognized: np.ndarray
+	plate_boxes: np.ndarray
+	plate_scores: np.ndarray
+	elapsed: np.ndarray
+	# Symbols of plate i are symbol_*[offsets[i]:offsets[i + 1]]
+	offsets: np.ndarray
+	symbol_ids: np.ndarray
+	symbol_boxes: np.ndarray
+	symbol_scores: np.ndarray
+
+	def __len__(self):
+		return len(self.names)
+
+	def __getitem__(self, idx: int) -> "PlateView":
+		if idx < 0:
+			idx += len(self)
+		if not 0 <= idx < len(self):
+			raise IndexError(idx)
+		return PlateView(self, idx)
+
+	def __iter__(self) -> Iterator["PlateView"]:
+		for idx in range(len(self)):
+			yield PlateView(self, idx)
+
+	@property
+	def counts(self) -> np.ndarray:
+		return np.diff(self.offsets)
+
+	def texts(self, alphabet: str = SYMBOLS_EN) -> List[str | None]:
+		# All symbols are decoded in one go and the string is only cut into plates afterwards
+		decoded = decode_table(alphabet)[self.symbol_ids].tobytes().decode("utf-32-le")
+		bounds = self.offsets.tolist()
+		return [
+			decoded[start:end] if recognized else None
+			for start, end, recognized in zip(bounds[:-1], bounds[1:], self.recognized.tolist())
+		]
+
+	def to_numpy(self) -> dict:
+		return {
+			"found": self.found,
+			"recognized": self.recognized,
+			"plate_boxes": self.plate_boxes,
+			"plate_scores": self.plate_scores,
+			"elapsed": self.elapsed,
+			"offsets": self.offsets,
+			"symbol_ids": self.symbol_ids,
+			"symbol_boxes": self.symbol_boxes,
+			"symbol_scores": self.symbol_scores,
+		}
+
+	def to_arrow(self, alphabet: str = SYMBOLS_EN):
+		try:
+			import pyarrow as pa
+		except ImportError:
+			raise ImportError("PlateBatch.to_arrow requires pyarrow: pip install pyarrow")
+
+		# Value buffers are wrapped without copying, only validity masks and text are built here
+		missing = pa.array(~self.found)
+		unrecognized = pa.array(~self.recognized)
+		offsets = pa.array(self.offsets)
+
+		plate_boxes = pa.FixedSizeListArray.from_arrays(pa.array(self.plate_boxes.reshape(-1)), 4, mask=missing)
+		symbol_boxes = pa.FixedSizeListArray.from_arrays(pa.array(self.symbol_boxes.reshape(-1)), 4)
+
+		# Missing scores are null as in ParquetSink.write, not NaN
+		plate_scores = pa.array(self.plate_scores, mask=~self.found | np.isnan(self.plate_scores))
+		symbol_scores = pa.array(self.symbol_scores, mask=np.isnan(self.symbol_scores))
+
+		return pa.table({
+			"name": pa.array(self.names, pa.string()),
+			"plate_box": plate_boxes,
+			"plate_score": plate_scores,
+			"text": pa.array(self.texts(alphabet), pa.string()),
+			"symbol_ids": pa.ListArray.from_arrays(offsets, pa.array(self.symbol_ids), mask=unrecognized),
+			"symbol_boxes": pa.ListArray.from_arrays(offsets, symbol_boxes, mask=unrecognized),
+			"symbol_scores": pa.ListArray.from_arrays(offsets, symbol_scores, mask=unrecognized),
+			"elapsed": pa.array(self.elapsed, mask=np.isnan(self.elapsed)),
+		})
+
+	def results(self) -> Iterator[Result]:
+		for view in self:
+			yield view.to_result()
+
+	@classmethod
+	def from_results(cls, results: List[Result]) -> "PlateBatch":
+		builder = PlateBatchBuilder()
+		for result in results:
+			symbols = None
+			if result.symbols is not None:
+				symbols = (
+					np.array([s.id for s in result.symbols], dtype=np.uint8),
+					np.array([s.rect.coords() for s in result.symbols], dtype=np.float32).reshape(-1, 4),
+					np.array([np.nan if s.rect.score is None else s.rect.score for s in result.symbols], dtype=np.float32),
+				)
+			builder.append(result.name, result.plate, symbols, result.elapsed)
+		return builder.build()
+
+
+class PlateView:
+	def __init__(self, batch: PlateBatch, idx: int):
+		self.batch = batch
+		self.idx = idx
+
+	@property
+	def name(self) -> str:
+		return self.batch.names[self.idx]
+
+	@property
+	def found(self) -> bool:
+		return bool(self.batch.found[self.idx])
+
+	@property
+	def box(self) -> np.ndarray:
+		return self.batch.plate_boxes[self.idx]
+
+	@property
+	def score(self) -> float:
+		return float(self.batch.plate_scores[self.idx])
+
+	@property
+	def __symbols__(self) -> slice:
+		return slice(self.batch.offsets[self.idx], self.batch.offsets[self.idx + 1])
+
+	@property
+	def symbol_ids(self) -> np.ndarray:
+		return self.batch.symbol_ids[self.__symbols__]
+
+	@property
+	def symbol_boxes(self) -> np.ndarray:
+		return self.batch.symbol_boxes[self.__symbols__]
+
+	@property
+	def symbol_scores(self) -> np.ndarray:
+		return self.batch.symbol_scores[self.__symbols__]
+
+	def text(self, alphabet: str = SYMBOLS_EN) -> str | None:
+		if not self.batch.recognized[self.idx]:
+			return None
+		return "".join(alphabet[i] for i in self.symbol_ids.tolist())
+
+	def to_result(self) -> Result:
+		plate = None
+		if self.found:
+			plate = Rect(*self.box.tolist(), score=optional(self.score))
+
+		symbols = None
+		if self.batch.recognized[self.idx]:
+			symbols = [
+				Symbol(i, Rect(*box, score=optional(score)))
+				for i, box, score in zip(
+					self.symbol_ids.tolist(), self.symbol_boxes.tolist(), self.symbol_scores.tolist()
+				)
+			]
+
+		elapsed = optional(float(self.batch.elapsed[self.idx]))
+		return Result(name=self.name, plate=plate, symbols=symbols, elapsed=elapsed)
+
+	def __repr__(self) -> str:
+		return f"PlateView({self.name!r}, {self.text()!r})"
+
+
+class PlateBatchBuilder:
+	def __init__(self):
+		self.names = []
+		self.found = []
+		self.recognized = []
+		self.plate_boxes = []
+		self.plate_scores = []
+		self.elapsed = []
+		self.counts = []
+		self.symbol_ids = []
+		self.symbol_boxes = []
+		self.symbol_scores = []
+
+	def append(
+		self,
+		name: str,
+		plate: Rect | None,
+		symbols: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None,
+		elapsed: float | None = None,
+	):
+		self.names.append(name)
+		self.found.append(plate is not None)
+		self.plate_boxes.append(plate.coords() if plate is not None else (np.nan,) * 4)
+		self.plate_scores.append(plate.score if plate is not None and plate.score is not None else np.nan)
+		self.elapsed.append(elapsed if elapsed is not None else np.nan)
+
+		self.recognized.append(symbols is not None)
+		if symbols is None:
+			self.counts.append(0)
+			return
+
+		ids, boxes, scores = symbols
+		self.counts.append(len(ids))
+		self.symbol_ids.append(ids)
+		self.symbol_boxes.append(boxes)
+		self.symbol_scores.append(scores)
+
+	def build(self) -> PlateBatch:
+		offsets = np.zeros(len(self.names) + 1, dtype=np.int32)
+		np.cumsum(self.counts, out=offsets[1:])
+
+		def concat(arrays, dtype, shape):
+			if len(arrays) == 0:
+				return np.empty(shape, dtype=dtype)
+			return np.concatenate(arrays).astype(dtype, copy=False)
+
+		return PlateBatch(
+			names=self.names,
+			found=np.array(self.found, dtype=bool),
+			recognized=np.array(self.recognized, dtype=bool),
+			plate_boxes=np.array(self.plate_boxes, dtype=np.float32).reshape(-1, 4),
+			plate_scores=np.array(self.plate_scores, dtype=np.float32),
+			elapsed=np.array(self.elapsed, dtype=np.float64),
+			offsets=offsets,
+			symbol_ids=concat(self.symbol_ids, np.uint8, (0,)),
+			symbol_boxes=concat(self.symbol_boxes, np.float32, (0, 4)),
+			symbol_scores=concat(self.symbol_scores, np.float32, (0,)),
+		)
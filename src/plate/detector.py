@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 import torch
 from torch import Tensor
@@ -8,13 +8,33 @@ from torchvision import transforms
 from src.plate.plate import Rect
 from src.plate.util import image_size_from_args
 from src.util import dfine
+from src.util.compile import OptimizedModel, PINNED_BATCHES
+
+
+def extract_plate(boxes: Tensor, scores: Tensor, thresh: float) -> Rect | None:
+	confident = scores > thresh
+	if not torch.any(confident):
+		return None
+
+	scores = scores[confident]
+	boxes = boxes[confident]
+
+	score = scores * torch.sqrt(boxes[:, 2] * boxes[:, 3])
+	max_score = torch.argmax(score)
+
+	box = boxes[max_score]
+	box = Rect(*box.tolist(), score=scores[max_score].item())
+
+	return box
 
 
 class PlateDetector:
+	size = 640
+
 	@property
 	def transform(self):
 		return transforms.Compose([
-			transforms.Resize((640, 640)),
+			transforms.Resize((self.size, self.size)),
 			transforms.ToTensor(),
 		])
 
@@ -24,48 +44,47 @@ class PlateDetector:
 		checkpoint: Path,
 		device: torch.device,
 		thresh: float,
+		size: int | None = None,
 	):
 		super().__init__()
 		self.device = device
 		self.thresh = thresh
 
-		self.model = dfine.load_torch_model(config, checkpoint)
+		# A smaller input suits ROI crops, the backbone needs it to be a multiple of 32
+		if size is not None:
+			if size % 32 != 0:
+				raise ValueError(f"Input size must be a multiple of 32, got {size}")
+			self.size = size
+
+		self.model = dfine.load_torch_model(config, checkpoint, size)
 		self.model.eval()
 		self.model.to(device)
 
-	def __extract_plate__(self, boxes: Tensor, scores: Tensor) -> Rect | None:
-		confident = scores > self.thresh
-		if not torch.any(confident):
-			return None
-
-		scores = scores[confident]
-		boxes = boxes[confident]
+	def optimize(self, bf16: bool = False, use_compile: bool = True, batches=PINNED_BATCHES):
+		self.model = OptimizedModel(self.model, self.size, batches, bf16, use_compile)
+		self.model.warmup(self.device)
 
-		score = scores * torch.sqrt(boxes[:, 2] * boxes[:, 3])
-		max_score = torch.argmax(score)
-
-		box = boxes[max_score]
-		box = Rect(*box.tolist())
+	def __extract_plate__(self, boxes: Tensor, scores: Tensor) -> Rect | None:
+		return extract_plate(boxes, scores, self.thresh)
 
-		return box
+	def extract(self, labels: Tensor, boxes: Tensor, scores: Tensor) -> Rect | None:
+		return self.__extract_plate__(boxes, scores)
 
 	@torch.inference_mode()
-	def __call__(self, *args) -> Rect | List[Rect] | None:
+	def raw(self, *args) -> List[Tuple[Tensor, Tensor, Tensor]]:
 		image, size = image_size_from_args(self.transform, *args)
 
 		image = image.to(self.device)
 		size = size.to(self.device)
 
 		results = self.model(image, size)
-		results = zip(*results)
-
-		if image.size(0) == 1:
-			_, boxes, scores = next(results)
-			return self.__extract_plate__(boxes, scores)
-
-		plates = []
-		for _, boxes, scores in results:
-			plate = self.__extract_plate__(boxes, scores)
-			plates.append(plate)
+		return [
+			(labels.cpu(), boxes.cpu(), scores.cpu())
+			for labels, boxes, scores in zip(*results)
+		]
 
+	def __call__(self, *args) -> Rect | List[Rect] | None:
+		plates = [self.extract(*output) for output in self.raw(*args)]
+		if len(plates) == 1:
+			return plates[0]
 		return plates
@@ -0,0 +1,234 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import List, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from src.plate.plate import Symbol, SYMBOLS_EN
+from src.util.parallel import bounded_map, chunked
+
+if TYPE_CHECKING:
+	from src.plate.pipeline import PlatePipeline
+	from src.util.outputs import OutputStore
+
+GROUND_TRUTH_PATTERN = re.compile(r"\[([\s\w]+)]")
+
+# Last row/column of the confusion matrix stands for a missing symbol (insertion or deletion)
+BLANK = len(SYMBOLS_EN)
+
+
+def parse_ground_truth(name: str) -> List[int] | None:
+	match = GROUND_TRUTH_PATTERN.search(name)
+	if match is None:
+		return None
+
+	ground_truth = match.group(1).replace(" ", "")
+	try:
+		return [Symbol.str2id(s) for s in ground_truth]
+	except ValueError:
+		return None
+
+
+def align(truth: List[int], predicted: List[int]) -> List[Tuple[int, int]]:
+	n, m = len(truth), len(predicted)
+	dist = [[0] * (m + 1) for _ in range(n + 1)]
+	for i in range(n + 1):
+		dist[i][0] = i
+	for j in range(m + 1):
+		dist[0][j] = j
+
+	for i in range(1, n + 1):
+		for j in range(1, m + 1):
+			cost = truth[i - 1] != predicted[j - 1]
+			dist[i][j] = min(dist[i - 1][j] + 1, dist[i][j - 1] + 1, dist[i - 1][j - 1] + cost)
+
+	# Backtrace into (truth, predicted) pairs, BLANK marking the missing side
+	pairs = []
+	i, j = n, m
+	while i > 0 or j > 0:
+		if i > 0 and j > 0 and dist[i][j] == dist[i - 1][j - 1] + (truth[i - 1] != predicted[j - 1]):
+			pairs.append((truth[i - 1], predicted[j - 1]))
+			i, j = i - 1, j - 1
+		elif i > 0 and dist[i][j] == dist[i - 1][j] + 1:
+			pairs.append((truth[i - 1], BLANK))
+			i -= 1
+		else:
+			pairs.append((BLANK, predicted[j - 1]))
+			j -= 1
+
+	pairs.reverse()
+	return pairs
+
+
+@dataclass
+class Evaluation:
+	total: int = 0
+	exact: int = 0
+	not_found: int = 0
+	no_ground_truth: int = 0
+	char_errors: int = 0
+	char_total: int = 0
+	confusion: np.ndarray = field(default_factory=lambda: np.zeros((BLANK + 1, BLANK + 1), dtype=np.int64))
+	latencies: List[float] = field(default_factory=list)
+	# Wall time of whole pipeline calls and their sizes, per-image latency is not observable inside a batch
+	batch_latencies: List[float] = field(default_factory=list)
+	batch_sizes: List[int] = field(default_factory=list)
+
+	def add(self, truth: List[int] | None, predicted: List[int] | None, latency: float | None = None):
+		if latency is not None:
+			self.latencies.append(latency)
+
+		if truth is None:
+			self.no_ground_truth += 1
+			return
+
+		self.total += 1
+		if predicted is None:
+			self.not_found += 1
+			predicted = []
+
+		if truth == predicted:
+			self.exact += 1
+
+		for t, p in align(truth, predicted):
+			self.confusion[t, p] += 1
+			self.char_errors += t != p
+		self.char_total += len(truth)
+
+	def merge(self, other: "Evaluation"):
+		self.total += other.total
+		self.exact += other.exact
+		self.not_found += other.not_found
+		self.no_ground_truth += other.no_ground_truth
+		self.char_errors += other.char_errors
+		self.char_total += other.char_total
+		self.confusion += other.confusion
+		self.latencies += other.latencies
+		self.batch_latencies += other.batch_latencies
+		self.batch_sizes += other.batch_sizes
+
+	def report(self) -> dict:
+		labels = list(SYMBOLS_EN) + ["-"]
+		report = {
+			"total": self.total,
+			"exact": self.exact,
+			"exact_match_rate": self.exact / self.total if self.total else None,
+			"character_error_rate": self.char_errors / self.char_total if self.char_total else None,
+			"not_found": self.not_found,
+			"no_ground_truth": self.no_ground_truth,
+			"confusion": {
+				"labels": labels,
+				"matrix": self.confusion.tolist(),
+			},
+		}
+
+		if self.latencies:
+			latencies = np.array(self.latencies)
+			p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+			report["latency"] = {
+				"count": len(latencies),
+				"mean": float(latencies.mean()),
+				"p50": float(p50),
+				"p95": float(p95),
+				"p99": float(p99),
+				"max": float(latencies.max()),
+			}
+
+		if self.batch_latencies:
+			latencies = np.array(self.batch_latencies)
+			p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+			report["batch_latency"] = {
+				"count": len(latencies),
+				"mean_batch": float(np.mean(self.batch_sizes)),
+				"mean": float(latencies.mean()),
+				"p50": float(p50),
+				"p95": float(p95),
+				"p99": float(p99),
+				"max": float(latencies.max()),
+				"images_per_second": float(sum(self.batch_sizes) / latencies.sum()),
+			}
+
+		return report
+
+
+def read_label_file(path: Path) -> Tuple[List[int] | None, List[int]]:
+	predicted = []
+	with open(path) as f:
+		for line in f:
+			if line.strip():
+				predicted.append(int(line.split(" ", maxsplit=1)[0]))
+	return parse_ground_truth(path.stem), predicted
+
+
+def evaluate_label_files(paths: List[Path]) -> Evaluation:
+	evaluation = Evaluation()
+	for path in paths:
+		evaluation.add(*read_label_file(path))
+	return evaluation
+
+
+def evaluate_labels(src: Path, workers: int | None = None) -> Evaluation:
+	evaluation = Evaluation()
+
+	if src.is_file():
+		# JSONL output of the label commands, carries timings as well
+		with open(src) as f:
+			for line in f:
+				result = json.loads(line)
+				symbols = result["symbols"]
+				predicted = [s["id"] for s in symbols] if symbols is not None else None
+				evaluation.add(parse_ground_truth(result["name"]), predicted, result.get("elapsed"))
+		return evaluation
+
+	files = (
+		Path(entry.path)
+		for entry in os.scandir(src)
+		if entry.is_file() and entry.name.endswith(".txt")
+	)
+	# Each worker evaluates a whole chunk of files and only the aggregated counters travel back
+	for partial in bounded_map(evaluate_label_files, chunked(files, 1024), workers, chunksize=1):
+		evaluation.merge(partial)
+
+	return evaluation
+
+
+def evaluate_images(src: Path, pipeline: "PlatePipeline", batch: int, workers: int | None = None) -> Evaluation:
+	from src.plate.pipeline import image_batch_loader
+
+	# The models run in this process, workers decode images ahead of them
+	evaluation = Evaluation()
+	for names, images in image_batch_loader(src, batch, workers if workers is not None else 4):
+		if len(names) == 0:
+			continue
+
+		start = perf_counter()
+		plates = pipeline(list(images))
+		evaluation.batch_latencies.append(perf_counter() - start)
+		evaluation.batch_sizes.append(len(names))
+
+		for name, plate in zip(names, plates):
+			predicted = [symbol.id for symbol in plate.symbols] if plate is not None else None
+			evaluation.add(parse_ground_truth(name), predicted)
+
+	return evaluation
+
+
+def evaluate_sweep(store: "OutputStore", thresholds: List[float]) -> List[Evaluation]:
+	from src.plate.recognizer import extract_symbols
+
+	for thresh in thresholds:
+		store.check(thresh)
+
+	evaluations = [Evaluation() for _ in thresholds]
+	for name, (labels, boxes, scores) in store:
+		truth = parse_ground_truth(name)
+		for thresh, evaluation in zip(thresholds, evaluations):
+			symbols = extract_symbols(labels, boxes, scores, thresh)
+			predicted = [symbol.id for symbol in symbols] if symbols is not None else None
+			evaluation.add(truth, predicted)
+
+	return evaluations
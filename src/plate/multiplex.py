@@ -0,0 +1,215 @@
+import shutil
+import subprocess
+import threading
+from abc import abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Callable, Iterator, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.util.files import IMAGE_EXTENSIONS
+
+
+@dataclass
+class Frame:
+	source: str
+	index: int
+	image: Image.Image
+	captured: float
+
+
+class Source:
+	def __init__(self, name: str, fps: float | None = None, buffer: int = 4):
+		self.name = name
+		self.fps = fps
+		self.buffer = buffer
+
+		self.frames = deque()
+		self.read = 0
+		self.dropped = 0
+		self.processed = 0
+		self.lags = []
+		self.done = False
+		self.condition = None
+		self.thread = None
+
+	@abstractmethod
+	def __frames__(self) -> Iterator[Image.Image]:
+		pass
+
+	def start(self, condition: threading.Condition):
+		self.condition = condition
+		self.thread = threading.Thread(target=self.__run__, daemon=True)
+		self.thread.start()
+
+	def __run__(self):
+		interval = 1 / self.fps if self.fps else 0
+		next_time = perf_counter()
+
+		try:
+			for image in self.__frames__():
+				# Frame-rate cap, a source that fell behind is not allowed to burst to catch up
+				if interval:
+					now = perf_counter()
+					if next_time > now:
+						sleep(next_time - now)
+					next_time = max(next_time, now) + interval
+
+				frame = Frame(self.name, self.read, image, perf_counter())
+				self.read += 1
+
+				with self.condition:
+					if not self.fps:
+						# Sources without a frame rate are not live, they wait for room instead of losing frames
+						while len(self.frames) >= self.buffer:
+							self.condition.wait()
+					elif len(self.frames) >= self.buffer:
+						# Under backpressure the oldest frame is dropped, keeping what is processed fresh
+						self.frames.popleft()
+						self.dropped += 1
+					self.frames.append(frame)
+					self.condition.notify()
+		finally:
+			with self.condition:
+				self.done = True
+				self.condition.notify()
+
+	@property
+	def finished(self) -> bool:
+		return self.done and len(self.frames) == 0
+
+	def report(self) -> dict:
+		lags = np.array(self.lags) if self.lags else None
+		return {
+			"read": self.read,
+			"processed": self.processed,
+			"dropped": self.dropped,
+			"lag_p50": float(np.percentile(lags, 50)) if lags is not None else None,
+			"lag_p95": float(np.percentile(lags, 95)) if lags is not None else None,
+			"lag_max": float(lags.max()) if lags is not None else None,
+		}
+
+
+class FolderSource(Source):
+	def __init__(self, root: Path, fps: float | None = None, buffer: int = 4, name: str | None = None):
+		super().__init__(name or root.name, fps, buffer)
+		self.root = root
+
+	def __frames__(self) -> Iterator[Image.Image]:
+		files = sorted(file for file in self.root.iterdir() if file.suffix.lower() in IMAGE_EXTENSIONS)
+		for file in files:
+			try:
+				yield Image.open(file).convert("RGB")
+			except Exception:
+				print(f"Failed to decode image: {file}")
+
+
+def probe_video_size(path: Path) -> Tuple[int, int]:
+	ffprobe = shutil.which("ffprobe")
+	if ffprobe is None:
+		raise RuntimeError("ffprobe is required to read video")
+
+	output = subprocess.run(
+		[
+			ffprobe, "-v", "error", "-select_streams", "v:0",
+			"-show_entries", "stream=width,height", "-of", "csv=s=x:p=0", str(path),
+		],
+		capture_output=True, text=True, check=True,
+	).stdout
+	width, height = output.strip().split("x")[:2]
+	return int(width), int(height)
+
+
+class VideoSource(Source):
+	def __init__(self, path: Path, fps: float | None = None, buffer: int = 4, name: str | None = None):
+		super().__init__(name or path.stem, fps, buffer)
+		self.path = path
+
+	def __frames__(self) -> Iterator[Image.Image]:
+		ffmpeg = shutil.which("ffmpeg")
+		if ffmpeg is None:
+			raise RuntimeError("ffmpeg is required to read video")
+
+		width, height = probe_video_size(self.path)
+		command = [ffmpeg, "-loglevel", "error", "-i", str(self.path)]
+		if self.fps:
+			# Frames above the cap are dropped by the decoder instead of being decoded and thrown away
+			command += ["-vf", f"fps={self.fps}"]
+		command += ["-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+
+		size = width * height * 3
+		process = subprocess.Popen(command, stdout=subprocess.PIPE)
+		try:
+			while True:
+				data = process.stdout.read(size)
+				if len(data) < size:
+					break
+				yield Image.frombytes("RGB", (width, height), data)
+		finally:
+			process.kill()
+			process.wait()
+
+
+def open_source(path: Path, fps: float | None = None, buffer: int = 4) -> Source:
+	if path.is_dir():
+		return FolderSource(path, fps, buffer)
+	return VideoSource(path, fps, buffer)
+
+
+class Multiplexer:
+	def __init__(
+		self, sources: List[Source], pipeline: Callable[[List[Image.Image], List[str]], list], batch: int = 16,
+	):
+		names = [source.name for source in sources]
+		if len(set(names)) != len(names):
+			raise ValueError(f"Source names must be unique: {names}")
+
+		self.sources = sources
+		self.pipeline = pipeline
+		self.batch = batch
+		self.condition = threading.Condition()
+		self.next = 0
+
+	def __collect__(self) -> List[Tuple[Source, Frame]]:
+		# Round-robin over sources, one frame per source per turn, starting where the last batch stopped
+		batch = []
+		ready = True
+		while len(batch) < self.batch and ready:
+			ready = False
+			for i in range(len(self.sources)):
+				source = self.sources[(self.next + i) % len(self.sources)]
+				if source.frames and len(batch) < self.batch:
+					batch.append((source, source.frames.popleft()))
+					ready = True
+		self.next = (self.next + 1) % len(self.sources)
+		return batch
+
+	def __iter__(self) -> Iterator[Tuple[Frame, object]]:
+		for source in self.sources:
+			source.start(self.condition)
+
+		while True:
+			with self.condition:
+				while not any(source.frames for source in self.sources):
+					if all(source.finished for source in self.sources):
+						return
+					self.condition.wait(0.1)
+				batch = self.__collect__()
+				self.condition.notify_all()
+
+			# Frames of every source are taken in order and batches run one after another,
+			# so results come back in order within each source
+			plates = self.pipeline([frame.image for _, frame in batch], [frame.source for _, frame in batch])
+			done = perf_counter()
+
+			for (source, frame), plate in zip(batch, plates):
+				source.processed += 1
+				source.lags.append(done - frame.captured)
+				yield frame, plate
+
+	def report(self) -> dict:
+		return {source.name: source.report() for source in self.sources}
@@ -0,0 +1,205 @@
+from dataclasses import replace
+from pathlib import Path
+from time import perf_counter
+from typing import List
+
+from PIL import Image
+from torch.utils import data
+from tqdm import tqdm
+
+from src.plate.batch import PlateBatch, PlateBatchBuilder, empty_symbols
+from src.plate.detector import PlateDetector
+from src.plate.plate import Plate, Rect
+from src.plate.recognizer import PlateRecognizer, extract_symbol_arrays
+from src.plate.roi import RoiManager, shift_rect
+from src.util.data import ImageDataset, StreamingImageDataset
+from src.util.dedup import DedupIndex, DedupStats
+from src.util.digest import hash_files
+from src.util.files import IMAGE_EXTENSIONS
+from src.util.sink import Result
+
+
+class PlatePipeline:
+	def __init__(self, detector: PlateDetector, recognizer: PlateRecognizer, roi: RoiManager | None = None):
+		self.detector = detector
+		self.recognizer = recognizer
+		self.roi = roi
+
+	def __detect__(self, images: List[Image.Image], sources: List[str] | None) -> List[Rect | None]:
+		if self.roi is None or sources is None:
+			return [self.detector.extract(*output) for output in self.detector.raw(images)]
+
+		# Only the ROI of each source is fed to the detector, boxes are then moved back into the full frame
+		crops, offsets = zip(*(self.roi.crop(source, image) for source, image in zip(sources, images)))
+		outputs = self.detector.raw(list(crops))
+
+		rects = []
+		for source, image, (dx, dy), output in zip(sources, images, offsets, outputs):
+			rect = shift_rect(self.detector.extract(*output), dx, dy)
+			if rect is not None:
+				self.roi.observe(source, rect, image.size)
+			rects.append(rect)
+		return rects
+
+	def __call__(self, images: List[Image.Image], sources: List[str] | None = None) -> List[Plate | None]:
+		plates = [None] * len(images)
+		if len(images) == 0:
+			return plates
+
+		rects = self.__detect__(images, sources)
+
+		found = [(i, rect) for i, rect in enumerate(rects) if rect is not None]
+		if len(found) == 0:
+			return plates
+
+		crops = [images[i].crop(rect.coords()) for i, rect in found]
+		symbols = self.recognizer(crops)
+		if len(crops) == 1:
+			symbols = [symbols]
+
+		for (i, rect), plate_symbols in zip(found, symbols):
+			plates[i] = Plate(rect, plate_symbols or [])
+
+		return plates
+
+	def batch(self, names: List[str], images: List[Image.Image], sources: List[str] | None = None) -> PlateBatch:
+		builder = PlateBatchBuilder()
+		if len(images) == 0:
+			return builder.build()
+
+		start = perf_counter()
+		rects = self.__detect__(images, sources)
+
+		symbols = {}
+		found = [i for i, rect in enumerate(rects) if rect is not None]
+		if len(found) > 0:
+			crops = [images[i].crop(rects[i].coords()) for i in found]
+			outputs = self.recognizer.raw(crops)
+			# A found plate without confident symbols has an empty symbol list, as in __call__
+			for i, output in zip(found, outputs):
+				symbols[i] = extract_symbol_arrays(*output, self.recognizer.thresh) or empty_symbols()
+
+		elapsed = (perf_counter() - start) / len(images)
+		for i, (name, rect) in enumerate(zip(names, rects)):
+			builder.append(name, rect, symbols.get(i), elapsed)
+
+		return builder.build()
+
+
+def image_batch_loader(
+	path: Path, batch: int, workers: int = 4, items: List[str] | None = None, recursive: bool = False,
+):
+	def collate_batch(batch):
+		batch = [b for b in batch if b is not None]
+		if len(batch) == 0:
+			return (), ()
+		names, _, images = zip(*batch)
+		return names, images
+
+	if recursive:
+		dataset = StreamingImageDataset(path)
+	else:
+		dataset = ImageDataset(path, items=items)
+	loader = data.DataLoader(
+		dataset,
+		batch_size=batch,
+		shuffle=False,
+		num_workers=workers,
+		collate_fn=collate_batch,
+	)
+
+	return loader
+
+
+def pipeline_handle_path(path: Path, pipeline: PlatePipeline, batch: int):
+	if path.is_file():
+		image = Image.open(path).convert("RGB")
+		yield path.name, image, pipeline([image])[0]
+
+	elif path.is_dir():
+		for names, images in tqdm(image_batch_loader(path, batch)):
+			plates = pipeline(list(images))
+			yield from zip(names, images, plates)
+
+
+def pipeline_handle_batches(path: Path, pipeline: PlatePipeline, batch: int, recursive: bool = False):
+	if path.is_file():
+		image = Image.open(path).convert("RGB")
+		yield pipeline.batch([path.name], [image], ["."])
+		return
+
+	for names, images in tqdm(image_batch_loader(path, batch, recursive=recursive)):
+		if len(names) == 0:
+			continue
+
+		# Files of a recursive scan are grouped into sources by their folder, e.g. date/camera
+		sources = [str(Path(name).parent) for name in names]
+		yield pipeline.batch(list(names), list(images), sources)
+
+
+def dedup_handle_path(
+	path: Path, pipeline: PlatePipeline, batch: int, index: DedupIndex, stats: DedupStats, chunk: int = 1024,
+):
+	if path.is_file():
+		root, names = path.parent, [path.name]
+	else:
+		root, names = path, sorted(file.name for file in path.iterdir() if file.suffix.lower() in IMAGE_EXTENSIONS)
+
+	progress = tqdm(total=len(names))
+	seen = set()
+
+	# Files are handled a chunk at a time, so inference starts after the first chunk is hashed
+	# and results come out in input order
+	for offset in range(0, len(names), chunk):
+		chunk_names = names[offset:offset + chunk]
+
+		# Raw bytes are hashed before anything is decoded
+		start = perf_counter()
+		digests = hash_files([root / name for name in chunk_names])
+		stats.hash_time += perf_counter() - start
+		stats.total += len(chunk_names)
+
+		# Only the first file of every unknown hash goes through the models,
+		# everything else is answered from the index
+		unique = {}
+		for name, digest in zip(chunk_names, digests):
+			if digest not in seen and digest not in index:
+				unique[name] = digest
+				seen.add(digest)
+
+		results = {}
+		for batch_names, images in image_batch_loader(root, batch, items=list(unique)):
+			if len(batch_names) == 0:
+				continue
+
+			start = perf_counter()
+			plates = pipeline(list(images))
+			elapsed = (perf_counter() - start) / len(batch_names)
+
+			for name, plate in zip(batch_names, plates):
+				result = Result(
+					name=name,
+					plate=plate.rect if plate is not None else None,
+					symbols=plate.symbols if plate is not None else None,
+					elapsed=elapsed,
+				)
+				index.put(unique[name], result)
+				results[name] = result
+
+		for name, digest in zip(chunk_names, digests):
+			if name in unique:
+				if name in results:
+					yield results[name]
+				continue
+
+			result = index.get(digest)
+			if result is None:
+				# The original could not be decoded
+				continue
+
+			stats.duplicates += 1
+			stats.saved_time += result.elapsed or 0.0
+			yield replace(result, name=name, elapsed=0.0)
+
+		progress.update(len(chunk_names))
+	progress.close()
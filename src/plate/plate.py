@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List
 
 from PIL import ImageFont
@@ -13,6 +14,7 @@ class Rect:
 	lty: int
 	rbx: int
 	rby: int
+	score: float | None = None
 
 	def height(self) -> float:
 		return self.rby - self.lty
@@ -29,6 +31,10 @@ class Rect:
 
 SYMBOLS_EN = "0123456789ABEKMHOPCTYX"
 SYMBOLS_RU = "0123456789АВЕКМНОРСТУХ"
+SYMBOL_IDS = {
+	**{symbol: i for i, symbol in enumerate(SYMBOLS_EN)},
+	**{symbol: i for i, symbol in enumerate(SYMBOLS_RU)},
+}
 
 
 @dataclass
@@ -38,15 +44,10 @@ class Symbol:
 
 	@staticmethod
 	def str2id(symbol: str) -> "int":
-		symbol = symbol.upper()
 		try:
-			symbol = SYMBOLS_RU.index(symbol)
-		except ValueError:
-			try:
-				symbol = SYMBOLS_EN.index(symbol)
-			except ValueError:
-				raise ValueError(f"Unknown symbol {symbol}")
-		return symbol
+			return SYMBOL_IDS[symbol.upper()]
+		except KeyError:
+			raise ValueError(f"Unknown symbol {symbol}")
 
 	def __repr__(self) -> str:
 		return SYMBOLS_EN[self.id]
@@ -61,6 +62,11 @@ class Plate:
 		return "".join(str(symbol) for symbol in self.symbols)
 
 
+@lru_cache(maxsize=64)
+def load_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+	return ImageFont.load_default(size)
+
+
 def draw_rect(image: Image | ImageDraw, rect: Rect):
 	if isinstance(image, Image):
 		image = ImageDraw(image)
@@ -84,7 +90,7 @@ def draw_symbols(image: Image | ImageDraw, symbols: List[Symbol]):
 
 		# size = int(0.5 * symbol.rect.height())
 		# pos = (symbol.rect.ltx, symbol.rect.rby)
-		# image.text(pos, str(symbol), font=ImageFont.load_default(size))
+		# image.text(pos, str(symbol), font=load_font(size))
 
 
 def draw_plate(image: Image | ImageDraw, plate: Plate):
@@ -94,6 +100,6 @@ def draw_plate(image: Image | ImageDraw, plate: Plate):
 	draw_rect(image, plate.rect)
 	symbols = "".join(str(symbol) for symbol in plate.symbols)
 
-	size = int(0.75 * plate.rect.height())
+	size = max(1, int(0.75 * plate.rect.height()))
 	pos = (plate.rect.ltx, plate.rect.rby)
-	image.text(pos, symbols, fill="red", font=ImageFont.load_default(size))
+	image.text(pos, symbols, fill="red", font=load_font(size))
@@ -0,0 +1,230 @@
+import sqlite3
+import time
+from dataclasses import dataclass
+from itertools import combinations
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from src.plate.plate import Rect, SYMBOLS_EN, SYMBOLS_RU
+from src.util.sink import Result
+
+# Characters the recognizer mixes up, every class collapses to its first character in the skeleton key
+CONFUSION_CLASSES = ["0O", "8B"]
+CONFUSION = {c: group[0] for group in CONFUSION_CLASSES for c in group[1:]}
+# Cyrillic plate letters look the same as their Latin counterparts, so both spellings share a key
+SKELETON = str.maketrans({
+	**CONFUSION,
+	**{ru: CONFUSION.get(en, en) for ru, en in zip(SYMBOLS_RU, SYMBOLS_EN) if ru != en},
+})
+
+
+def skeleton(text: str) -> str:
+	return text.upper().translate(SKELETON)
+
+
+def deletions(text: str, distance: int) -> set[str]:
+	# Symmetric delete: two strings within edit distance d share a variant with at most d deletions each
+	variants = {text}
+	for n in range(1, min(distance, len(text)) + 1):
+		for positions in combinations(range(len(text)), n):
+			variants.add("".join(c for i, c in enumerate(text) if i not in positions))
+	return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+	if abs(len(a) - len(b)) > limit:
+		return limit + 1
+
+	previous = list(range(len(b) + 1))
+	for i, ca in enumerate(a, 1):
+		current = [i]
+		for j, cb in enumerate(b, 1):
+			current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+		if min(current) > limit:
+			return limit + 1
+		previous = current
+	return previous[-1]
+
+
+@dataclass
+class Read:
+	id: int
+	text: str
+	time: float
+	source: str | None
+	rect: Rect | None
+
+
+class ReadStore:
+	def __init__(self, path: Path, distance: int = 2, buffer: int = 4096):
+		self.buffer = buffer
+		self.rows = []
+		self.plates = {}
+
+		self.db = sqlite3.connect(path)
+		self.db.execute("PRAGMA journal_mode = WAL")
+		self.db.execute("PRAGMA synchronous = NORMAL")
+		self.db.executescript("""
+			CREATE TABLE IF NOT EXISTS meta (
+				key TEXT PRIMARY KEY,
+				value TEXT NOT NULL
+			);
+			CREATE TABLE IF NOT EXISTS plates (
+				id INTEGER PRIMARY KEY,
+				text TEXT NOT NULL UNIQUE,
+				skeleton TEXT NOT NULL
+			);
+			CREATE TABLE IF NOT EXISTS deletes (
+				variant TEXT NOT NULL,
+				plate_id INTEGER NOT NULL,
+				PRIMARY KEY (variant, plate_id)
+			) WITHOUT ROWID;
+			CREATE TABLE IF NOT EXISTS reads (
+				id INTEGER PRIMARY KEY,
+				plate_id INTEGER NOT NULL REFERENCES plates(id),
+				time REAL NOT NULL,
+				source TEXT,
+				ltx REAL, lty REAL, rbx REAL, rby REAL, score REAL
+			);
+			CREATE INDEX IF NOT EXISTS reads_plate_time ON reads (plate_id, time);
+		""")
+
+		# The deletion index is built for a fixed distance, so the first one used sticks with the store
+		with self.db:
+			self.db.execute("INSERT OR IGNORE INTO meta VALUES ('distance', ?)", (str(distance),))
+		self.distance = int(self.db.execute("SELECT value FROM meta WHERE key = 'distance'").fetchone()[0])
+
+	def add(self, text: str, timestamp: float | None = None, source: str | None = None, rect: Rect | None = None):
+		timestamp = time.time() if timestamp is None else timestamp
+		coords = rect.coords() if rect is not None else (None,) * 4
+		score = rect.score if rect is not None else None
+		self.rows.append((text.upper(), timestamp, source, *coords, score))
+
+		if len(self.rows) >= self.buffer:
+			self.flush()
+
+	def add_result(self, result: Result, timestamp: float | None = None, source: str | None = None):
+		text = result.text()
+		if text:
+			self.add(text, timestamp, source, result.plate)
+
+	def __plate_ids__(self, texts: Iterable[str]) -> dict:
+		missing = [text for text in set(texts) if text not in self.plates]
+		for text in missing:
+			row = self.db.execute("SELECT id FROM plates WHERE text = ?", (text,)).fetchone()
+			if row is not None:
+				self.plates[text] = row[0]
+				continue
+
+			key = skeleton(text)
+			cursor = self.db.execute("INSERT INTO plates (text, skeleton) VALUES (?, ?)", (text, key))
+			self.plates[text] = cursor.lastrowid
+			self.db.executemany(
+				"INSERT OR IGNORE INTO deletes VALUES (?, ?)",
+				((variant, cursor.lastrowid) for variant in deletions(key, self.distance)),
+			)
+		return self.plates
+
+	def flush(self):
+		if len(self.rows) == 0:
+			return
+
+		# Only new plate strings touch the deletion index, repeated sightings are a plain append
+		with self.db:
+			plates = self.__plate_ids__(row[0] for row in self.rows)
+			self.db.executemany(
+				"INSERT INTO reads (plate_id, time, source, ltx, lty, rbx, rby, score) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+				((plates[text], *rest) for text, *rest in self.rows),
+			)
+		self.rows = []
+
+	def __reads__(self, plate_ids: List[int], start: float | None, end: float | None, limit: int | None) -> List[Read]:
+		if len(plate_ids) == 0:
+			return []
+
+		# Ids are joined from a temp table, an IN list of every candidate could exceed SQLite's host parameter limit.
+		# CROSS JOIN keeps the candidates as the outer loop, so plates and reads are looked up through their indexes
+		with self.db:
+			self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (plate_id INTEGER PRIMARY KEY)")
+			self.db.execute("DELETE FROM wanted")
+			self.db.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((id,) for id in plate_ids))
+
+		query = """
+			SELECT reads.id, plates.text, time, source, ltx, lty, rbx, rby, score
+			FROM wanted
+			CROSS JOIN plates ON plates.id = wanted.plate_id
+			CROSS JOIN reads ON reads.plate_id = wanted.plate_id
+		"""
+		conditions, params = [], []
+		if start is not None:
+			conditions.append("time >= ?")
+			params.append(start)
+		if end is not None:
+			conditions.append("time < ?")
+			params.append(end)
+		if len(conditions) > 0:
+			query += " WHERE " + " AND ".join(conditions)
+		query += " ORDER BY time"
+		if limit is not None:
+			query += " LIMIT ?"
+			params.append(limit)
+
+		reads = []
+		for id, text, timestamp, source, ltx, lty, rbx, rby, score in self.db.execute(query, params):
+			rect = Rect(ltx, lty, rbx, rby, score) if ltx is not None else None
+			reads.append(Read(id, text, timestamp, source, rect))
+		return reads
+
+	def exact(self, text: str, start: float | None = None, end: float | None = None, limit: int | None = None) -> List[Read]:
+		self.flush()
+		row = self.db.execute("SELECT id FROM plates WHERE text = ?", (text.upper(),)).fetchone()
+		return self.__reads__([row[0]] if row is not None else [], start, end, limit)
+
+	def __candidates__(self, text: str, distance: int | None) -> List[Tuple[int, str, int]]:
+		distance = self.distance if distance is None else distance
+		if distance > self.distance:
+			raise ValueError(f"Store is indexed for distance {self.distance}, {distance} requested")
+
+		self.flush()
+		key = skeleton(text)
+		variants = list(deletions(key, distance))
+		rows = self.db.execute(
+			f"""
+				SELECT DISTINCT plates.id, plates.text, plates.skeleton
+				FROM deletes JOIN plates ON plates.id = deletes.plate_id
+				WHERE variant IN ({", ".join("?" * len(variants))})
+			""",
+			variants,
+		)
+
+		# The deletion index only narrows the search, the real distance is checked on the candidates
+		matches = []
+		for id, candidate, candidate_key in rows:
+			d = edit_distance(key, candidate_key, distance)
+			if d <= distance:
+				matches.append((id, candidate, d))
+		matches.sort(key=lambda match: (match[2], match[1]))
+		return matches
+
+	def candidates(self, text: str, distance: int | None = None) -> List[Tuple[str, int]]:
+		# Plate strings within the distance of the query, confusable characters counting as equal
+		return [(candidate, d) for _, candidate, d in self.__candidates__(text, distance)]
+
+	def fuzzy(
+		self, text: str, distance: int | None = None,
+		start: float | None = None, end: float | None = None, limit: int | None = None,
+	) -> List[Tuple[Read, int]]:
+		matches = self.__candidates__(text, distance)
+		distances = {candidate: d for _, candidate, d in matches}
+		reads = self.__reads__([id for id, _, _ in matches], start, end, limit)
+		return [(read, distances[read.text]) for read in reads]
+
+	def close(self):
+		self.flush()
+		self.db.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
@@ -1,6 +1,7 @@
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 import torch
 from torch import Tensor
 from torchvision import transforms
@@ -8,9 +9,55 @@ from torchvision import transforms
 from src.plate.plate import Symbol, Rect
 from src.plate.util import image_size_from_args
 from src.util import dfine
+from src.util.compile import OptimizedModel, PINNED_BATCHES
+
+
+def extract_symbols(labels: Tensor, boxes: Tensor, scores: Tensor, thresh: float) -> List[Symbol] | None:
+	confident = scores > thresh
+	if not torch.any(confident):
+		return None
+
+	scores = scores[confident]
+	labels = labels[confident]
+	boxes = boxes[confident]
+
+	indices = range(len(boxes))
+	indices = sorted(indices, key=lambda i: (boxes[i][0], boxes[i][1]))
+
+	symbols = []
+	for i in indices:
+		box = boxes[i]
+		label = labels[i]
+		score = scores[i]
+
+		symbol = Symbol(
+			id=label.item(),
+			rect=Rect(*box.tolist(), score=score.item())
+		)
+		symbols.append(symbol)
+
+	return symbols
+
+
+def extract_symbol_arrays(
+	labels: Tensor, boxes: Tensor, scores: Tensor, thresh: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+	# Same selection and order as extract_symbols, without building a Symbol per detection
+	confident = scores > thresh
+	if not torch.any(confident):
+		return None
+
+	labels = labels[confident].numpy()
+	boxes = boxes[confident].numpy()
+	scores = scores[confident].numpy()
+
+	order = np.lexsort((boxes[:, 1], boxes[:, 0]))
+	return labels[order].astype(np.uint8), boxes[order].astype(np.float32), scores[order].astype(np.float32)
 
 
 class PlateRecognizer:
+	size = 256
+
 	def __init__(
 		self,
 		config: Path,
@@ -26,56 +73,40 @@ class PlateRecognizer:
 		self.model.eval()
 		self.model.to(device)
 
+	def optimize(self, bf16: bool = False, use_compile: bool = True, batches=PINNED_BATCHES):
+		self.model = OptimizedModel(self.model, self.size, batches, bf16, use_compile)
+		self.model.warmup(self.device)
+
 	@property
 	def transform(self):
 		return transforms.Compose([
-			transforms.Resize((256, 256)),
+			transforms.Resize((self.size, self.size)),
 			transforms.ToTensor(),
 		])
 
 	Symbols = List[Symbol]
 
 	def __extract_symbols__(self, labels: Tensor, boxes: Tensor, scores: Tensor) -> Symbols | None:
-		confident = scores > self.thresh
-		if not torch.any(confident):
-			return None
-
-		# scores = scores[confident]
-		boxes = boxes[confident]
-
-		indices = range(len(boxes))
-		indices = sorted(indices, key=lambda i: (boxes[i][0], boxes[i][1]))
-
-		symbols = []
-		for i in indices:
-			box = boxes[i]
-			label = labels[i]
+		return extract_symbols(labels, boxes, scores, self.thresh)
 
-			symbol = Symbol(
-				id=label.item(),
-				rect=Rect(*box.tolist())
-			)
-			symbols.append(symbol)
-
-		return symbols
+	def extract(self, labels: Tensor, boxes: Tensor, scores: Tensor) -> Symbols | None:
+		return self.__extract_symbols__(labels, boxes, scores)
 
 	@torch.inference_mode()
-	def __call__(self, *args) -> Symbols | List[Symbols] | None:
+	def raw(self, *args) -> List[Tuple[Tensor, Tensor, Tensor]]:
 		image, size = image_size_from_args(self.transform, *args)
 
 		size = size.to(self.device)
 		image = image.to(self.device)
 
 		results = self.model(image, size)
-		results = zip(*results)
-
-		if image.size(0) == 1:
-			labels, boxes, scores = next(results)
-			return self.__extract_symbols__(labels, boxes, scores)
-
-		plates = []
-		for result in results:
-			plate = self.__extract_symbols__(*result)
-			plates.append(plate)
+		return [
+			(labels.cpu(), boxes.cpu(), scores.cpu())
+			for labels, boxes, scores in zip(*results)
+		]
 
+	def __call__(self, *args) -> Symbols | List[Symbols] | None:
+		plates = [self.extract(*output) for output in self.raw(*args)]
+		if len(plates) == 1:
+			return plates[0]
 		return plates
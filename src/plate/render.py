@@ -0,0 +1,134 @@
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from PIL import Image, ImageOps
+from PIL.ImageDraw import ImageDraw
+
+from src.plate.plate import Rect, Symbol, Plate, draw_rect, draw_plate
+from src.util.files import output_path
+
+
+def scale_rect(rect: Rect, scale: float) -> Rect:
+	if scale == 1:
+		return rect
+	return Rect(rect.ltx * scale, rect.lty * scale, rect.rbx * scale, rect.rby * scale, rect.score)
+
+
+def scale_plate(plate: Plate, scale: float) -> Plate:
+	symbols = [Symbol(symbol.id, scale_rect(symbol.rect, scale)) for symbol in plate.symbols]
+	return Plate(scale_rect(plate.rect, scale), symbols)
+
+
+def render(
+	image: Image.Image,
+	rects: List[Rect] = (),
+	plates: List[Plate] = (),
+	scale: float = 1.0,
+) -> Image.Image:
+	# Downscaling happens before drawing, so both drawing and encoding work on the smaller frame
+	if scale != 1:
+		size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+		image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+	# A single ImageDraw for every overlay of the frame
+	draw = ImageDraw(image)
+	for rect in rects:
+		draw_rect(draw, scale_rect(rect, scale))
+	for plate in plates:
+		draw_plate(draw, scale_plate(plate, scale))
+
+	return image
+
+
+class ImageWriter:
+	def __init__(self, dst: Path, workers: int = 4, quality: int = 90):
+		self.dst = dst
+		self.quality = quality
+		self.limit = 4 * workers
+
+		# PIL releases the GIL while encoding, so frames are encoded on a few threads,
+		# with the number of frames in flight bounded to keep memory flat
+		self.pool = ThreadPoolExecutor(workers)
+		self.pending = deque()
+
+	def write(self, name: str, image: Image.Image):
+		path = output_path(self.dst, name)
+
+		self.pending.append(self.pool.submit(image.save, path, quality=self.quality))
+		while len(self.pending) > self.limit:
+			self.pending.popleft().result()
+
+	def close(self):
+		while self.pending:
+			self.pending.popleft().result()
+		self.pool.shutdown()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+
+class VideoWriter:
+	def __init__(self, path: Path, fps: float = 25, size: Tuple[int, int] | None = None, crf: int = 23):
+		self.path = path
+		self.fps = fps
+		self.size = size
+		self.crf = crf
+		self.process = None
+
+	def __open__(self, size: Tuple[int, int]):
+		ffmpeg = shutil.which("ffmpeg")
+		if ffmpeg is None:
+			raise RuntimeError("ffmpeg is required to write video")
+
+		# yuv420p needs even dimensions
+		width, height = max(2, size[0] // 2 * 2), max(2, size[1] // 2 * 2)
+		self.size = (width, height)
+		self.process = subprocess.Popen(
+			[
+				ffmpeg, "-loglevel", "error", "-y",
+				"-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+				"-c:v", "libx264", "-preset", "veryfast", "-crf", str(self.crf), "-pix_fmt", "yuv420p",
+				str(self.path),
+			],
+			stdin=subprocess.PIPE,
+		)
+
+	def write(self, name: str, image: Image.Image):
+		if self.process is None:
+			self.__open__(self.size or image.size)
+
+		image = image.convert("RGB")
+		if image.size != self.size:
+			# Video frames have a fixed size, so frames of other sizes are letterboxed into it
+			image = ImageOps.pad(image, self.size)
+
+		self.process.stdin.write(image.tobytes())
+
+	def close(self):
+		if self.process is None:
+			return
+
+		self.process.stdin.close()
+		code = self.process.wait()
+		self.process = None
+		if code != 0:
+			raise RuntimeError(f"ffmpeg exited with code {code}")
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+
+def frame_writer(dst: Path, video: Path | None = None, fps: float = 25):
+	if video is not None:
+		return VideoWriter(video, fps)
+	return ImageWriter(dst)
@@ -0,0 +1,123 @@
+import json
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from PIL.Image import Image
+
+from src.plate.plate import Rect
+
+
+@dataclass
+class Roi:
+	# Relative to the frame size, so one configuration holds for any resolution of the camera
+	ltx: float
+	lty: float
+	rbx: float
+	rby: float
+
+	def to_pixels(self, width: int, height: int) -> Tuple[int, int, int, int]:
+		ltx = max(0, int(self.ltx * width))
+		lty = max(0, int(self.lty * height))
+		rbx = min(width, max(ltx + 1, round(self.rbx * width)))
+		rby = min(height, max(lty + 1, round(self.rby * height)))
+		return ltx, lty, rbx, rby
+
+	def to_list(self) -> List[float]:
+		return [self.ltx, self.lty, self.rbx, self.rby]
+
+
+def shift_rect(rect: Rect | None, dx: float, dy: float) -> Rect | None:
+	if rect is None:
+		return None
+	return Rect(rect.ltx + dx, rect.lty + dy, rect.rbx + dx, rect.rby + dy, rect.score)
+
+
+class RoiManager:
+	def __init__(
+		self,
+		rois: Dict[str, Roi] | None = None,
+		learn: bool = False,
+		min_samples: int = 200,
+		margin: float = 0.05,
+		history: int = 10000,
+	):
+		self.rois = rois or {}
+		self.learn = learn
+		self.min_samples = min_samples
+		self.margin = margin
+		self.history_size = history
+
+		self.history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.history_size))
+		self.learned: Dict[str, Roi] = {}
+		self.pending: Dict[str, int] = defaultdict(int)
+
+	def roi(self, source: str) -> Roi | None:
+		# A configured ROI always wins over a learned one
+		return self.rois.get(source) or self.learned.get(source)
+
+	def crop(self, source: str, image: Image) -> Tuple[Image, Tuple[int, int]]:
+		roi = self.roi(source)
+		if roi is None:
+			return image, (0, 0)
+
+		ltx, lty, rbx, rby = roi.to_pixels(*image.size)
+		return image.crop((ltx, lty, rbx, rby)), (ltx, lty)
+
+	def observe(self, source: str, rect: Rect, size: Tuple[int, int]):
+		if not self.learn or source in self.rois:
+			return
+
+		width, height = size
+		self.history[source].append((rect.ltx / width, rect.lty / height, rect.rbx / width, rect.rby / height))
+
+		# The learned ROI is only refreshed every so often, not on every detection
+		self.pending[source] += 1
+		if self.pending[source] >= max(1, self.min_samples // 4):
+			self.pending[source] = 0
+			self.__learn__(source)
+
+	def __learn__(self, source: str):
+		history = self.history[source]
+		if len(history) < self.min_samples:
+			return
+
+		# Bounds of every plate seen, so the learned ROI never cuts off a place plates were found before
+		ltx, lty, rbx, rby = zip(*history)
+		self.learned[source] = Roi(
+			max(0.0, min(ltx) - self.margin),
+			max(0.0, min(lty) - self.margin),
+			min(1.0, max(rbx) + self.margin),
+			min(1.0, max(rby) + self.margin),
+		)
+
+	@classmethod
+	def load(cls, path: Path, **kwargs) -> "RoiManager":
+		with open(path) as f:
+			config = json.load(f)
+
+		rois = {source: Roi(*box) for source, box in config.get("rois", {}).items()}
+		manager = cls(rois, **kwargs)
+		for source, boxes in config.get("history", {}).items():
+			manager.history[source].extend(tuple(box) for box in boxes)
+			manager.__learn__(source)
+
+		return manager
+
+	def save(self, path: Path):
+		config = {
+			"rois": {source: roi.to_list() for source, roi in self.rois.items()},
+			"learned": {source: roi.to_list() for source, roi in self.learned.items()},
+			"history": {source: [list(box) for box in boxes] for source, boxes in self.history.items()},
+		}
+		with open(path, "w") as f:
+			json.dump(config, f)
+
+
+def open_roi(path: Path | None, learn: bool = False) -> RoiManager | None:
+	if path is None and not learn:
+		return None
+	if path is not None and path.exists():
+		return RoiManager.load(path, learn=learn)
+	return RoiManager(learn=learn)
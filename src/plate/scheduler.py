@@ -0,0 +1,208 @@
+import heapq
+import itertools
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import IntEnum
+from time import perf_counter
+from typing import Callable, Dict, List
+
+import numpy as np
+from PIL.Image import Image
+
+
+class Priority(IntEnum):
+	LIVE = 0
+	BACKFILL = 1
+
+
+DEFAULT_DEADLINES = {
+	Priority.LIVE: 0.3,
+	Priority.BACKFILL: float("inf"),
+}
+
+
+@dataclass(order=True)
+class Request:
+	deadline: float
+	seq: int
+	priority: Priority = field(compare=False)
+	image: Image = field(compare=False)
+	submitted: float = field(compare=False)
+	future: Future = field(compare=False)
+
+
+@dataclass
+class SchedulerStats:
+	submitted: Dict[Priority, int] = field(default_factory=lambda: defaultdict(int))
+	completed: Dict[Priority, int] = field(default_factory=lambda: defaultdict(int))
+	missed: Dict[Priority, int] = field(default_factory=lambda: defaultdict(int))
+	latencies: Dict[Priority, List[float]] = field(default_factory=lambda: defaultdict(list))
+	batches: List[int] = field(default_factory=list)
+
+	def report(self) -> dict:
+		report = {}
+		for priority in Priority:
+			latencies = self.latencies[priority]
+			p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (None,) * 3
+			report[priority.name.lower()] = {
+				"submitted": self.submitted[priority],
+				"completed": self.completed[priority],
+				"missed_deadlines": self.missed[priority],
+				"latency_p50": p50 if p50 is None else float(p50),
+				"latency_p95": p95 if p95 is None else float(p95),
+				"latency_p99": p99 if p99 is None else float(p99),
+			}
+
+		report["batches"] = len(self.batches)
+		report["mean_batch"] = float(np.mean(self.batches)) if self.batches else None
+		return report
+
+
+class Scheduler:
+	def __init__(
+		self,
+		pipeline: Callable[[List[Image]], list],
+		max_batch: int = 16,
+		backfill_slice: float = 0.1,
+		headroom: float = 0.8,
+		smoothing: float = 0.2,
+	):
+		self.pipeline = pipeline
+		self.max_batch = max_batch
+		# Upper bound for a backfill batch, a live request that arrives meanwhile waits at most this long
+		self.backfill_slice = backfill_slice
+		# Share of the remaining time a batch is planned to take, leaving room for estimate noise
+		self.headroom = headroom
+		self.smoothing = smoothing
+
+		self.live = []
+		self.backfill = []
+		self.seq = itertools.count()
+		self.condition = threading.Condition()
+		self.closed = False
+
+		# Batch latency estimates, per batch size and per image as a fallback
+		self.latency: Dict[int, float] = {}
+		self.per_image = None
+
+		self.stats = SchedulerStats()
+		self.thread = threading.Thread(target=self.__run__, daemon=True)
+		self.thread.start()
+
+	def submit(self, image: Image, priority: Priority = Priority.LIVE, deadline: float | None = None) -> Future:
+		now = perf_counter()
+		if deadline is None:
+			deadline = DEFAULT_DEADLINES[priority]
+
+		future = Future()
+		request = Request(now + deadline, next(self.seq), priority, image, now, future)
+
+		with self.condition:
+			if self.closed:
+				raise RuntimeError("Scheduler is closed")
+
+			queue = self.live if priority == Priority.LIVE else self.backfill
+			heapq.heappush(queue, request)
+			self.stats.submitted[priority] += 1
+			self.condition.notify()
+
+		return future
+
+	def estimate(self, n: int) -> float:
+		if n in self.latency:
+			return self.latency[n]
+		if self.per_image is None:
+			return 0.0
+		return self.per_image * n
+
+	def __batch_size__(self, budget: float) -> int:
+		# Largest batch expected to finish within the budget, but never less than one request
+		n = self.max_batch
+		while n > 1 and self.estimate(n) > budget:
+			n -= 1
+		return n
+
+	@staticmethod
+	def __pop__(queue: List[Request], batch: List[Request], n: int):
+		while len(batch) < n and queue:
+			request = heapq.heappop(queue)
+			# Requests cancelled by the caller while queued are dropped here
+			if request.future.set_running_or_notify_cancel():
+				batch.append(request)
+
+	def __next_batch__(self) -> List[Request]:
+		batch = []
+		if self.live:
+			# Live requests preempt backfill at batch boundaries, and the tightest deadline limits the batch
+			n = self.__batch_size__((self.live[0].deadline - perf_counter()) * self.headroom)
+			self.__pop__(self.live, batch, n)
+		else:
+			n = self.__batch_size__(self.backfill_slice)
+
+		# Spare room in the batch is filled with backfill work
+		self.__pop__(self.backfill, batch, n)
+		return batch
+
+	def __update__(self, n: int, elapsed: float):
+		previous = self.latency.get(n)
+		self.latency[n] = elapsed if previous is None else previous + self.smoothing * (elapsed - previous)
+
+		per_image = elapsed / n
+		if self.per_image is None:
+			self.per_image = per_image
+		else:
+			self.per_image += self.smoothing * (per_image - self.per_image)
+
+	def __run__(self):
+		while True:
+			with self.condition:
+				while not self.live and not self.backfill and not self.closed:
+					self.condition.wait()
+				if self.closed and not self.live and not self.backfill:
+					return
+				batch = self.__next_batch__()
+
+			if len(batch) == 0:
+				continue
+
+			start = perf_counter()
+			try:
+				results = self.pipeline([request.image for request in batch])
+				error = None
+			except Exception as e:
+				results = [None] * len(batch)
+				error = e
+			end = perf_counter()
+
+			self.__update__(len(batch), end - start)
+			self.stats.batches.append(len(batch))
+
+			for request, result in zip(batch, results):
+				if error is not None:
+					request.future.set_exception(error)
+					continue
+
+				self.stats.completed[request.priority] += 1
+				self.stats.latencies[request.priority].append(end - request.submitted)
+				if end > request.deadline:
+					self.stats.missed[request.priority] += 1
+				request.future.set_result(result)
+
+	def close(self, cancel: bool = False):
+		# Already queued requests are still processed unless cancelled
+		with self.condition:
+			self.closed = True
+			if cancel:
+				for request in self.live + self.backfill:
+					request.future.cancel()
+				self.live, self.backfill = [], []
+			self.condition.notify()
+		self.thread.join()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
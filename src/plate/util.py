@@ -14,7 +14,7 @@ def image_size_from_args(transform, *args):
 				image = transform(image).unsqueeze(0)
 			elif isinstance(image, List):
 				size = torch.tensor([i.size for i in image])
-				image = transform(image)
+				image = torch.stack([transform(i) for i in image], 0)
 			else:
 				raise TypeError()
 		case 2:
@@ -0,0 +1,97 @@
+from time import perf_counter
+from typing import Tuple
+
+import torch
+from torch import nn, Tensor
+
+PINNED_BATCHES = (1, 2, 4, 8, 16)
+
+
+class OptimizedModel(nn.Module):
+	def __init__(
+		self,
+		model: nn.Module,
+		size: int,
+		batches: Tuple[int, ...] = PINNED_BATCHES,
+		bf16: bool = False,
+		use_compile: bool = True,
+	):
+		super().__init__()
+		self.size = size
+		self.batches = tuple(sorted(batches))
+		self.bf16 = bf16
+
+		self.model = model.to(memory_format=torch.channels_last)
+		# Shapes are pinned, so a static graph per batch size is all that is ever needed
+		self.compiled = torch.compile(self.model, dynamic=False) if use_compile else self.model
+
+	def __forward__(self, images: Tensor, sizes: Tensor) -> Tuple[Tensor, Tensor, Tensor]:
+		n = images.size(0)
+		batch = next(b for b in self.batches if b >= n)
+
+		# Pad up to the closest pinned batch size to avoid recompiling for every remainder batch
+		if batch > n:
+			images = torch.cat([images, images.new_zeros(batch - n, *images.shape[1:])])
+			sizes = torch.cat([sizes, sizes[-1:].expand(batch - n, -1)])
+
+		images = images.contiguous(memory_format=torch.channels_last)
+		with torch.autocast(images.device.type, dtype=torch.bfloat16, enabled=self.bf16):
+			labels, boxes, scores = self.compiled(images, sizes)
+
+		return labels[:n], boxes[:n].float(), scores[:n].float()
+
+	def forward(self, images: Tensor, sizes: Tensor) -> Tuple[Tensor, Tensor, Tensor]:
+		limit = self.batches[-1]
+		if images.size(0) <= limit:
+			return self.__forward__(images, sizes)
+
+		chunks = [
+			self.__forward__(images[i:i + limit], sizes[i:i + limit])
+			for i in range(0, images.size(0), limit)
+		]
+		return tuple(torch.cat(parts) for parts in zip(*chunks))
+
+	@torch.inference_mode()
+	def warmup(self, device: torch.device):
+		for batch in self.batches:
+			images = torch.rand(batch, 3, self.size, self.size, device=device)
+			sizes = torch.tensor([[self.size, self.size]] * batch, device=device)
+			self(images, sizes)
+
+
+def top_by_score(t: Tensor, order: Tensor, k: int) -> Tensor:
+	if t.dim() == 3:
+		order = order[..., None].expand(-1, -1, t.size(-1))
+	return torch.gather(t, 1, order)[:, :k]
+
+
+@torch.inference_mode()
+def compare(eager: nn.Module, optimized: nn.Module, images: Tensor, sizes: Tensor, repeats: int = 10) -> dict:
+	def measure(model):
+		outputs = model(images, sizes)
+		start = perf_counter()
+		for _ in range(repeats):
+			model(images, sizes)
+		return outputs, (perf_counter() - start) / repeats
+
+	(eager_labels, eager_boxes, eager_scores), eager_time = measure(eager)
+	(labels, boxes, scores), optimized_time = measure(optimized)
+
+	# Query order may change once precision drops, so the top queries are compared by descending score
+	k = min(10, scores.size(1))
+	eager_order = eager_scores.argsort(dim=1, descending=True)
+	order = scores.argsort(dim=1, descending=True)
+
+	score_drift = top_by_score(eager_scores, eager_order, k) - top_by_score(scores, order, k)
+	box_drift = top_by_score(eager_boxes, eager_order, k) - top_by_score(boxes, order, k)
+	label_agreement = top_by_score(eager_labels, eager_order, k) == top_by_score(labels, order, k)
+
+	return {
+		"batch": images.size(0),
+		"eager_ms": eager_time * 1000,
+		"optimized_ms": optimized_time * 1000,
+		"speedup": eager_time / optimized_time,
+		"score_drift": score_drift.abs().max().item(),
+		"box_drift": box_drift.abs().max().item(),
+		"label_agreement": label_agreement.float().mean().item(),
+	}
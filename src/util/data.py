@@ -1,49 +1,80 @@
+import json
+import os
 from pathlib import Path
+from typing import Iterator, List
 
+import numpy as np
 import torch
 from PIL import Image
 from torch.utils import data
 
+from src.util.files import IMAGE_EXTENSIONS, scan_images
+from src.util.shard import read_tar_shard, decode_tar_sample, MemmapReader
+
+
+def load_image(root: Path, name: str, transform=None):
+	try:
+		original = Image.open(root / name)
+		image = original.convert("RGB")
+
+		if transform is not None:
+			image = transform(image)
+
+		return name, original, image
+	except:
+		return None
+
 
 class ImageDataset(data.Dataset):
-	def __init__(self, root: Path, transform=None):
+	def __init__(self, root: Path, transform=None, items: List[str] | None = None):
 		self.root = root
 		self.transform = transform
 
-		extensions = [".jpg", ".jpeg", ".png"]
+		if items is not None:
+			self.items = items
+			return
+
 		self.items = [
 			file.name
 			for file in root.iterdir()
-			if file.suffix.lower() in extensions
+			if file.suffix.lower() in IMAGE_EXTENSIONS
 		]
 
 	def __len__(self):
 		return len(self.items)
 
 	def __getitem__(self, idx):
-		try:
-			name = self.items[idx]
-			path = self.root / name
+		return load_image(self.root, self.items[idx], self.transform)
 
-			original = Image.open(path)
-			image = original.convert("RGB")
 
-			if self.transform is not None:
-				image = self.transform(image)
+class StreamingImageDataset(data.IterableDataset):
+	def __init__(self, root: Path, transform=None, sort: bool = False):
+		self.root = root
+		self.transform = transform
+		self.sort = sort
+
+	def __iter__(self):
+		# Workers split the tree into disjoint subtrees while walking it, so the split needs no shared state
+		worker = data.get_worker_info()
+		index, count = (worker.id, worker.num_workers) if worker is not None else (0, 1)
 
-			return name, original, image
-		except:
-			return None
+		for name in scan_images(self.root, self.sort, index, count):
+			item = load_image(self.root, name, self.transform)
+			if item is not None:
+				yield item
 
 
-def image_dir_loader(path: Path, batch: int, transform):
+def image_dir_loader(path: Path, batch: int, transform, recursive: bool = False):
 	def collate_batch(batch):
 		batch = (b for b in batch if b is not None)
 		names, originals, images = zip(*batch)
 		images = torch.stack(images, 0)
 		return names, originals, images
 
-	dataset = ImageDataset(path, transform=transform)
+	if recursive:
+		dataset = StreamingImageDataset(path, transform=transform)
+	else:
+		dataset = ImageDataset(path, transform=transform)
 	loader = data.DataLoader(
 		dataset,
 		batch_size=batch,
@@ -53,3 +84,90 @@ def image_dir_loader(path: Path, batch: int, transform):
 	)
 
 	return loader
+
+
+class TarShardDataset(data.IterableDataset):
+	def __init__(self, root: Path, transform=None, prefix: str = "shard"):
+		self.root = root
+		self.prefix = prefix
+		self.transform = transform
+
+	def __iter__(self):
+		shards = sorted(self.root.glob(f"{self.prefix}-*.tar"))
+
+		# Each worker reads whole shards, keeping reads sequential
+		worker = data.get_worker_info()
+		if worker is not None:
+			shards = shards[worker.id::worker.num_workers]
+
+		for path in shards:
+			for sample in read_tar_shard(path):
+				name, image, label = decode_tar_sample(sample)
+				if self.transform is not None:
+					image = self.transform(image)
+
+				yield name, image, label
+
+
+class MemmapDataset(data.Dataset):
+	def __init__(self, root: Path, transform=None, prefix: str = "shard"):
+		self.root = root
+		self.prefix = prefix
+		self.transform = transform
+		self.reader = None
+
+		# Only the index is read here, the memory map is opened lazily inside each worker
+		with open(root / f"{prefix}.json") as f:
+			self.length = len(json.load(f)["items"])
+
+	def __len__(self):
+		return self.length
+
+	def __getitem__(self, idx):
+		if self.reader is None:
+			self.reader = MemmapReader(self.root, self.prefix)
+
+		name, image, label = self.reader[idx]
+		image = Image.fromarray(np.array(image))
+		if self.transform is not None:
+			image = self.transform(image)
+
+		return name, image, label
+
+
+class CocoCacheDataset(data.Dataset):
+	def __init__(self, root: Path, transform=None, prefix: str = "cache"):
+		self.root = root
+		self.prefix = prefix
+		self.transform = transform
+		self.reader = None
+
+		self.length = len(MemmapReader(root, prefix))
+
+	def __len__(self):
+		return self.length
+
+	def __getitem__(self, idx):
+		# The memory map is opened lazily so that every DataLoader worker gets its own
+		if self.reader is None:
+			self.reader = MemmapReader(self.root, self.prefix)
+
+		_, image, label = self.reader[idx]
+		image = torch.from_numpy(np.array(image)).permute(2, 0, 1)
+		image = image.float() / 255
+
+		annotations = label["annotations"]
+		boxes = torch.tensor([a["bbox"] for a in annotations], dtype=torch.float32).reshape(-1, 4)
+		boxes[:, 2:] += boxes[:, :2]
+
+		target = {
+			"image_id": torch.tensor(label["id"]),
+			"boxes": boxes,
+			"labels": torch.tensor([a["category_id"] for a in annotations], dtype=torch.int64),
+			"orig_size": torch.tensor([label["width"], label["height"]]),
+		}
+
+		if self.transform is not None:
+			image, target = self.transform(image, target)
+
+		return image, target
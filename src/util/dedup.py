@@ -0,0 +1,95 @@
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+from src.util.sink import Result
+
+
+@dataclass
+class DedupStats:
+	total: int = 0
+	duplicates: int = 0
+	hash_time: float = 0.0
+	saved_time: float = 0.0
+
+	def report(self) -> dict:
+		return {
+			"total": self.total,
+			"duplicates": self.duplicates,
+			"duplicate_ratio": self.duplicates / self.total if self.total else None,
+			"hash_time": self.hash_time,
+			"saved_time": self.saved_time,
+		}
+
+
+def dedup_key(models: List[str], thresholds: List[float]) -> str:
+	return "-".join([*models, *(f"{thresh:g}" for thresh in thresholds)])
+
+
+class DedupIndex:
+	def __init__(self, path: Path, model: str, buffer: int = 1024):
+		self.model = model
+		self.buffer = buffer
+		self.rows = {}
+
+		# Results are only valid for the models and thresholds that produced them, so they are keyed by both
+		self.db = sqlite3.connect(path)
+		self.db.execute("PRAGMA journal_mode = WAL")
+		self.db.execute("""
+			CREATE TABLE IF NOT EXISTS results (
+				model TEXT NOT NULL,
+				hash TEXT NOT NULL,
+				result TEXT NOT NULL,
+				PRIMARY KEY (model, hash)
+			)
+		""")
+
+	def put(self, digest: str, result: Result):
+		self.rows[digest] = json.dumps(result.to_dict(), ensure_ascii=False)
+		if len(self.rows) >= self.buffer:
+			self.flush()
+
+	def get(self, digest: str) -> Result | None:
+		result = self.rows.get(digest)
+		if result is None:
+			row = self.db.execute(
+				"SELECT result FROM results WHERE model = ? AND hash = ?", (self.model, digest)
+			).fetchone()
+			if row is None:
+				return None
+			result = row[0]
+		return Result.from_dict(json.loads(result))
+
+	def __contains__(self, digest: str) -> bool:
+		if digest in self.rows:
+			return True
+		row = self.db.execute(
+			"SELECT 1 FROM results WHERE model = ? AND hash = ?", (self.model, digest)
+		).fetchone()
+		return row is not None
+
+	def __len__(self):
+		self.flush()
+		return self.db.execute("SELECT COUNT(*) FROM results WHERE model = ?", (self.model,)).fetchone()[0]
+
+	def flush(self):
+		if len(self.rows) == 0:
+			return
+		with self.db:
+			self.db.executemany(
+				"INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+				((self.model, digest, result) for digest, result in self.rows.items()),
+			)
+		self.rows = {}
+
+	def close(self):
+		self.flush()
+		self.db.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
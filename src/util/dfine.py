@@ -1,15 +1,44 @@
 from pathlib import Path
+from time import perf_counter
 
 import torch
 from PIL import Image
 from torch import nn
 from tqdm import tqdm
 
-from model.DFINE.src.core.yaml_config import YAMLConfig
 from src.util.data import image_dir_loader
+from src.util.files import is_image, scan_images
+from src.util.outputs import OutputStore
 
+SLIM_FORMAT = "dfine-deploy"
+# Decoder buffers precomputed for eval_spatial_size, they follow the input size rather than the weights
+SPATIAL_BUFFERS = ("anchors", "valid_mask")
+
+
+def select_state(checkpoint: dict) -> tuple[str, dict]:
+	# EMA weights are what training evaluates, the raw model is only a fallback
+	if "ema" in checkpoint:
+		return "ema", checkpoint["ema"]["module"]
+	return "model", checkpoint["model"]
+
+
+def load_state(model: nn.Module, state: dict, keep_spatial: bool = False):
+	# Buffers of a different input size than the checkpoint was trained at are kept from the model
+	if keep_spatial:
+		own = model.state_dict()
+		state = {
+			**state,
+			**{key: value for key, value in own.items() if key.rsplit(".", 1)[-1] in SPATIAL_BUFFERS},
+		}
+
+	# load_state_dict copies into the existing fp32 tensors, so reduced precision weights are upcast here
+	model.load_state_dict(state)
+
+
+def load_torch_model(config: str | Path, checkpoint: str | Path, size: int | None = None):
+	# The DFINE training stack, like torch in the scripts, is only imported once a model is built, keeping --help and light commands fast
+	from model.DFINE.src.core.yaml_config import YAMLConfig
 
-def load_torch_model(config: str | Path, checkpoint: str | Path):
 	if isinstance(config, Path):
 		config = str(config)
 	if isinstance(checkpoint, Path):
@@ -18,20 +47,25 @@ def load_torch_model(config: str | Path, checkpoint: str | Path):
 	cfg = YAMLConfig(cfg_path=config, resume=checkpoint)
 	if "HGNetv2" in cfg.yaml_cfg:
 		cfg.yaml_cfg["HGNetv2"]["pretrained"] = False
+	if size is not None:
+		# Deploy-mode decoder anchors are precomputed for eval_spatial_size, so it has to follow the input size
+		cfg.yaml_cfg["eval_spatial_size"] = [size, size]
 
 	checkpoint = torch.load(checkpoint, map_location="cpu")
-	if "ema" in checkpoint:
-		state = checkpoint["ema"]["module"]
+	if checkpoint.get("format") == SLIM_FORMAT:
+		# Slim artifacts hold deploy mode weights, so the model is converted before they are loaded
+		deployed = cfg.model.deploy()
+		load_state(deployed, checkpoint["model"], size is not None)
 	else:
-		state = checkpoint["model"]
-
-	# Load train mode state and convert to deploy mode
-	cfg.model.load_state_dict(state)
+		# Load train mode state and convert to deploy mode
+		_, state = select_state(checkpoint)
+		load_state(cfg.model, state, size is not None)
+		deployed = cfg.model.deploy()
 
 	class Model(nn.Module):
 		def __init__(self):
 			super().__init__()
-			self.model = cfg.model.deploy()
+			self.model = deployed
 			self.postprocessor = cfg.postprocessor.deploy()
 
 		def forward(self, images, orig_target_sizes):
@@ -43,17 +77,53 @@ def load_torch_model(config: str | Path, checkpoint: str | Path):
 	return model
 
 
-def dfine_handle_path(path: Path, dfine, batch: int):
+def dfine_handle_path(path: Path, dfine, batch: int, store: OutputStore | None = None, recursive: bool = False):
+	# Yields the loading and inference time of each item, time the consumer spends between items is not counted
 	if path.is_file():
+		start = perf_counter()
 		image = Image.open(path).convert("RGB")
-		result = dfine(image)
+		output = dfine.raw(image)[0]
+		if store is not None:
+			store.put(path.name, *output)
+		result = dfine.extract(*output)
 
-		yield path.name, image, result
+		yield path.name, image, result, perf_counter() - start
 
 	elif path.is_dir():
-		for names, originals, images in tqdm(image_dir_loader(path, batch, dfine.transform)):
+		start = perf_counter()
+		for names, originals, images in tqdm(image_dir_loader(path, batch, dfine.transform, recursive)):
 			sizes = torch.stack([torch.tensor(i.size) for i in originals])
-			results = dfine(images, sizes)
+			outputs = dfine.raw(images, sizes)
+			if store is not None:
+				for name, output in zip(names, outputs):
+					store.put(name, *output)
+			results = [dfine.extract(*output) for output in outputs]
+
+			# The batch is produced at once, so its cost is spread evenly over its items
+			elapsed = (perf_counter() - start) / len(names)
+			yield from zip(names, originals, results, [elapsed] * len(names))
+			start = perf_counter()
+
+
+def scanned_names(path: Path, recursive: bool = False) -> tuple[Path, list[str]]:
+	# Outputs are keyed by the path relative to the scanned root, the same name the loaders yield and the sinks write,
+	# so camA/0001.jpg and camB/0001.jpg of a recursive scan stay apart
+	if path.is_file():
+		return path.parent, [path.name]
+	if recursive:
+		return path, list(scan_images(path, sort=True))
+	return path, sorted(file.name for file in path.iterdir() if is_image(file.name))
+
+
+def dfine_replay(path: Path, store: OutputStore, extract, load_images: bool = True, recursive: bool = False):
+	# Replays stored raw outputs instead of running the model, only for the files under path
+	root, names = scanned_names(path, recursive)
+	for name in tqdm(names, disable=len(names) == 1):
+		start = perf_counter()
+		output = store.get(name)
+		if output is None:
+			continue
 
-			for name, original, result in zip(names, originals, results):
-				yield name, original, result
+		image = Image.open(root / name).convert("RGB") if load_images else None
+		result = extract(*output)
+		yield name, image, result, perf_counter() - start
@@ -0,0 +1,18 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+
+def hash_file(path: Path) -> str:
+	digest = hashlib.blake2b(digest_size=16)
+	with open(path, "rb") as f:
+		while chunk := f.read(1 << 20):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+def hash_files(paths: List[Path], workers: int = 8) -> List[str]:
+	# hashlib releases the GIL on large buffers, so threads are enough to keep the disk busy
+	with ThreadPoolExecutor(workers) as pool:
+		return list(pool.map(hash_file, paths))
@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+from typing import Iterator, List
+
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png"]
+
+
+def is_image(name: str) -> bool:
+	return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def output_path(dst: Path, name: str | Path) -> Path:
+	# Names from recursive scans keep their subdirectories, which are created on first use
+	path = dst / name
+	if path.parent != dst:
+		path.parent.mkdir(parents=True, exist_ok=True)
+	return path
+
+
+def list_dir(root: Path, relative: str) -> tuple[List[str], List[str]]:
+	# Materializes one directory in name order, only used on the bounded top of the tree
+	files, directories = [], []
+	for entry in sorted(os.scandir(root / relative), key=lambda entry: entry.name):
+		name = f"{relative}/{entry.name}" if relative else entry.name
+		if entry.is_dir(follow_symlinks=False):
+			directories.append(name)
+		elif is_image(entry.name):
+			files.append(name)
+	return files, directories
+
+
+def walk_images(root: Path, pending: List[str], sort: bool) -> Iterator[str]:
+	# Files are yielded while the directory is still being read, subdirectories are visited afterwards,
+	# so only the pending directory names are ever held in memory
+	pending = list(reversed(pending))
+	while pending:
+		relative = pending.pop()
+		directories = []
+		with os.scandir(root / relative) as entries:
+			if sort:
+				entries = sorted(entries, key=lambda entry: entry.name)
+
+			for entry in entries:
+				name = f"{relative}/{entry.name}" if relative else entry.name
+				if entry.is_dir(follow_symlinks=False):
+					directories.append(name)
+				elif is_image(entry.name):
+					yield name
+
+		pending.extend(reversed(directories))
+
+
+def scan_images(root: Path, sort: bool = False, shard: int = 0, shards: int = 1, split: int = 4) -> Iterator[str]:
+	if shards == 1:
+		yield from walk_images(root, [""], sort)
+		return
+
+	# The top of the tree is expanded the same way by every shard until there are enough subtrees to go around,
+	# then each shard walks only its own subtrees. Files met on the way are dealt out round-robin
+	pending = [""]
+	count = 0
+	while pending and len(pending) < shards * split:
+		files, directories = list_dir(root, pending.pop(0))
+		for name in files:
+			if count % shards == shard:
+				yield name
+			count += 1
+		pending.extend(directories)
+
+	yield from walk_images(root, pending[shard::shards], sort)
@@ -0,0 +1,59 @@
+import struct
+from pathlib import Path
+from typing import Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Start Of Frame markers carry the image dimensions, C4 (DHT), C8 (JPG) and CC (DAC) share the range but do not
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_png_size(f) -> Tuple[int, int] | None:
+	header = f.read(24)
+	if len(header) < 24 or header[12:16] != b"IHDR":
+		return None
+	width, height = struct.unpack(">II", header[16:24])
+	return width, height
+
+
+def read_jpeg_size(f) -> Tuple[int, int] | None:
+	f.read(2)
+	while True:
+		byte = f.read(1)
+		while byte and byte != b"\xff":
+			byte = f.read(1)
+		while byte == b"\xff":
+			byte = f.read(1)
+		if not byte:
+			return None
+
+		marker = byte[0]
+		# Standalone markers without a length field
+		if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+			continue
+
+		length = f.read(2)
+		if len(length) < 2:
+			return None
+		length, = struct.unpack(">H", length)
+
+		if marker in JPEG_SOF_MARKERS:
+			segment = f.read(5)
+			if len(segment) < 5:
+				return None
+			_, height, width = struct.unpack(">BHH", segment)
+			return width, height
+
+		f.seek(length - 2, 1)
+
+
+def read_image_size(path: Path) -> Tuple[int, int] | None:
+	with open(path, "rb") as f:
+		signature = f.read(8)
+		f.seek(0)
+
+		if signature.startswith(b"\xff\xd8"):
+			return read_jpeg_size(f)
+		if signature == PNG_SIGNATURE:
+			return read_png_size(f)
+	return None
@@ -0,0 +1,268 @@
+import io
+import os
+import queue
+import random
+import threading
+import urllib.request
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Callable, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from src.plate.scheduler import Priority
+from src.util.files import IMAGE_EXTENSIONS
+
+
+def image_files(path: Path) -> List[Path]:
+	return sorted(
+		file
+		for file in path.iterdir()
+		if file.is_file() and file.suffix.lower() in IMAGE_EXTENSIONS
+	)
+
+
+class Payloads:
+	# Files are read when a request is sent, so a large directory is never held in memory at once
+	def __init__(self, path: Path):
+		self.files = image_files(path)
+
+	def __len__(self):
+		return len(self.files)
+
+	def __getitem__(self, idx: int) -> bytes:
+		return self.files[idx].read_bytes()
+
+
+class InProcessTarget:
+	def __init__(self, pipeline):
+		self.pipeline = pipeline
+
+	def __call__(self, payload: bytes):
+		image = Image.open(io.BytesIO(payload)).convert("RGB")
+		return self.pipeline([image])
+
+
+class ScheduledTarget:
+	def __init__(self, scheduler, priority: Priority = Priority.LIVE, deadline: float | None = None):
+		self.scheduler = scheduler
+		self.priority = priority
+		self.deadline = deadline
+
+	def __call__(self, payload: bytes):
+		image = Image.open(io.BytesIO(payload)).convert("RGB")
+		return self.scheduler.submit(image, self.priority, self.deadline).result()
+
+
+class HttpTarget:
+	def __init__(self, url: str, timeout: float = 30):
+		self.url = url
+		self.timeout = timeout
+
+	def __call__(self, payload: bytes):
+		request = urllib.request.Request(
+			self.url,
+			data=payload,
+			headers={"Content-Type": "application/octet-stream"},
+			method="POST",
+		)
+		with urllib.request.urlopen(request, timeout=self.timeout) as response:
+			return response.read()
+
+
+def read_system_cpu() -> Tuple[int, int] | None:
+	# (busy, total) jiffies over all cores, only available on Linux
+	try:
+		with open("/proc/stat") as f:
+			values = [int(v) for v in f.readline().split()[1:]]
+	except OSError:
+		return None
+	idle = values[3] + values[4]
+	return sum(values) - idle, sum(values)
+
+
+@dataclass
+class LoadReport:
+	rate: float
+	offered: float
+	concurrency: int
+	requests: int
+	completed: int
+	errors: int
+	duration: float
+	throughput: float
+	latency_p50: float
+	latency_p95: float
+	latency_p99: float
+	queue_p50: float
+	queue_p95: float
+	service_p50: float
+	service_p95: float
+	process_cpu: float
+	system_cpu: float | None
+
+	def to_dict(self) -> dict:
+		return asdict(self)
+
+
+def percentiles(values: List[float]) -> Tuple[float, float, float]:
+	if len(values) == 0:
+		return float("nan"), float("nan"), float("nan")
+	p50, p95, p99 = np.percentile(values, [50, 95, 99])
+	return float(p50), float(p95), float(p99)
+
+
+def run_load(
+	target: Callable[[bytes], object],
+	payloads: Payloads,
+	rate: float,
+	duration: float,
+	concurrency: int,
+	seed: int = 0,
+) -> LoadReport:
+	# Open loop: arrivals follow a Poisson process regardless of how fast requests complete,
+	# so an overloaded target shows up as growing queueing delay instead of a lower send rate
+	rng = random.Random(seed)
+	arrivals = []
+	t = 0.0
+	while True:
+		t += rng.expovariate(rate)
+		if t >= duration:
+			break
+		arrivals.append(t)
+
+	pending = queue.Queue()
+	samples = []
+	errors = 0
+	lock = threading.Lock()
+
+	def worker():
+		nonlocal errors
+		while True:
+			item = pending.get()
+			if item is None:
+				return
+
+			i, scheduled = item
+			payload = payloads[i % len(payloads)]
+			start = perf_counter()
+			try:
+				target(payload)
+				failed = False
+			except Exception:
+				failed = True
+			end = perf_counter()
+
+			with lock:
+				if failed:
+					errors += 1
+				else:
+					samples.append((scheduled, start, end))
+
+	workers = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+	for thread in workers:
+		thread.start()
+
+	cpu_start = os.times()
+	system_start = read_system_cpu()
+	begin = perf_counter()
+
+	for i, arrival in enumerate(arrivals):
+		delay = begin + arrival - perf_counter()
+		if delay > 0:
+			sleep(delay)
+		pending.put((i, begin + arrival))
+
+	for _ in workers:
+		pending.put(None)
+	for thread in workers:
+		thread.join()
+
+	wall = perf_counter() - begin
+	cpu_end = os.times()
+	system_end = read_system_cpu()
+
+	cpu = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+	process_cpu = cpu / wall / (os.cpu_count() or 1)
+
+	system_cpu = None
+	if system_start is not None and system_end is not None:
+		busy = system_end[0] - system_start[0]
+		total = system_end[1] - system_start[1]
+		system_cpu = busy / total if total > 0 else None
+
+	latency = [end - scheduled for scheduled, start, end in samples]
+	queueing = [start - scheduled for scheduled, start, end in samples]
+	service = [end - start for scheduled, start, end in samples]
+
+	latency_p50, latency_p95, latency_p99 = percentiles(latency)
+	queue_p50, queue_p95, _ = percentiles(queueing)
+	service_p50, service_p95, _ = percentiles(service)
+
+	return LoadReport(
+		rate=rate,
+		offered=len(arrivals) / duration,
+		concurrency=concurrency,
+		requests=len(arrivals),
+		completed=len(samples),
+		errors=errors,
+		duration=wall,
+		throughput=len(samples) / wall,
+		latency_p50=latency_p50,
+		latency_p95=latency_p95,
+		latency_p99=latency_p99,
+		queue_p50=queue_p50,
+		queue_p95=queue_p95,
+		service_p50=service_p50,
+		service_p95=service_p95,
+		process_cpu=process_cpu,
+		system_cpu=system_cpu,
+	)
+
+
+def sustained(report: LoadReport, slo: float) -> bool:
+	return (
+		report.errors == 0
+		and report.latency_p95 <= slo
+		and report.throughput >= 0.9 * report.offered
+	)
+
+
+def find_saturation(
+	target: Callable[[bytes], object],
+	payloads: Payloads,
+	slo: float,
+	duration: float,
+	concurrency: int,
+	start_rate: float = 1.0,
+	steps: int = 5,
+) -> Tuple[float | None, List[LoadReport]]:
+	# Doubles the rate until the p95 target is missed, then bisects between the last good and the first bad rate
+	reports = []
+	good, bad = None, None
+
+	rate = start_rate
+	while bad is None:
+		report = run_load(target, payloads, rate, duration, concurrency)
+		reports.append(report)
+		if sustained(report, slo):
+			good = rate
+			rate *= 2
+		else:
+			bad = rate
+
+	if good is None:
+		return None, reports
+
+	for _ in range(steps):
+		rate = (good + bad) / 2
+		report = run_load(target, payloads, rate, duration, concurrency)
+		reports.append(report)
+		if sustained(report, slo):
+			good = rate
+		else:
+			bad = rate
+
+	return good, reports
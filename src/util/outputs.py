@@ -0,0 +1,107 @@
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import torch
+from torch import Tensor
+
+Output = Tuple[Tensor, Tensor, Tensor]
+
+
+def model_hash(config: Path, checkpoint: Path) -> str:
+	digest = hashlib.sha256()
+	for path in (config, checkpoint):
+		with open(path, "rb") as f:
+			while chunk := f.read(1 << 20):
+				digest.update(chunk)
+	return digest.hexdigest()[:16]
+
+
+class OutputStore:
+	def __init__(self, path: Path, model: str, floor: float = 0.01, buffer: int = 1024):
+		self.model = model
+		self.floor = floor
+		self.buffer = buffer
+		self.rows = []
+
+		self.db = sqlite3.connect(path)
+		self.db.execute("PRAGMA journal_mode = WAL")
+		self.db.execute("""
+			CREATE TABLE IF NOT EXISTS outputs (
+				model TEXT NOT NULL,
+				name TEXT NOT NULL,
+				labels BLOB NOT NULL,
+				boxes BLOB NOT NULL,
+				scores BLOB NOT NULL,
+				PRIMARY KEY (model, name)
+			)
+		""")
+
+	def check(self, thresh: float):
+		# Replayed outputs only hold queries above the floor, a lower threshold would not match a live run
+		if thresh < self.floor:
+			raise ValueError(f"Threshold {thresh} is below the cache floor {self.floor}")
+
+	def put(self, name: str, labels: Tensor, boxes: Tensor, scores: Tensor):
+		# Queries below the floor can never pass any sensible threshold, so they are not stored
+		keep = scores > self.floor
+		self.rows.append((
+			self.model,
+			name,
+			labels[keep].numpy().astype(np.int16).tobytes(),
+			boxes[keep].numpy().astype(np.float32).tobytes(),
+			scores[keep].numpy().astype(np.float32).tobytes(),
+		))
+
+		if len(self.rows) >= self.buffer:
+			self.flush()
+
+	@staticmethod
+	def __decode__(labels: bytes, boxes: bytes, scores: bytes) -> Output:
+		labels = np.frombuffer(labels, dtype=np.int16).astype(np.int64)
+		boxes = np.frombuffer(boxes, dtype=np.float32).reshape(-1, 4)
+		scores = np.frombuffer(scores, dtype=np.float32)
+		return torch.from_numpy(labels), torch.from_numpy(boxes.copy()), torch.from_numpy(scores.copy())
+
+	def get(self, name: str) -> Output | None:
+		self.flush()
+		row = self.db.execute(
+			"SELECT labels, boxes, scores FROM outputs WHERE model = ? AND name = ?",
+			(self.model, name),
+		).fetchone()
+		if row is None:
+			return None
+		return self.__decode__(*row)
+
+	def __iter__(self):
+		self.flush()
+		rows = self.db.execute(
+			"SELECT name, labels, boxes, scores FROM outputs WHERE model = ? ORDER BY name",
+			(self.model,),
+		)
+		for name, *output in rows:
+			yield name, self.__decode__(*output)
+
+	def __len__(self):
+		self.flush()
+		row = self.db.execute("SELECT COUNT(*) FROM outputs WHERE model = ?", (self.model,)).fetchone()
+		return row[0]
+
+	def flush(self):
+		if len(self.rows) == 0:
+			return
+		with self.db:
+			self.db.executemany("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?)", self.rows)
+		self.rows = []
+
+	def close(self):
+		self.flush()
+		self.db.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
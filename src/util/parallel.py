@@ -0,0 +1,33 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, List
+
+
+def apply_chunk(fn: Callable, chunk: List):
+	return [fn(item) for item in chunk]
+
+
+def chunked(iterable: Iterable, size: int):
+	iterator = iter(iterable)
+	while chunk := list(islice(iterator, size)):
+		yield chunk
+
+
+def bounded_map(fn: Callable, iterable: Iterable, workers: int | None = None, chunksize: int = 256):
+	# Unlike Executor.map, only a few chunks per worker are in flight at any time,
+	# so neither the input nor the results are ever fully materialized
+	workers = workers or os.cpu_count()
+	window = 4 * workers
+
+	with ProcessPoolExecutor(workers) as pool:
+		pending = deque()
+
+		for chunk in chunked(iterable, chunksize):
+			pending.append(pool.submit(apply_chunk, fn, chunk))
+			if len(pending) >= window:
+				yield from pending.popleft().result()
+
+		while pending:
+			yield from pending.popleft().result()
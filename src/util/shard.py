@@ -0,0 +1,152 @@
+import io
+import json
+import tarfile
+from pathlib import Path
+from typing import Tuple, Any
+
+import numpy as np
+from PIL import Image
+
+
+class TarShardWriter:
+	def __init__(self, dst: Path, shard_size: int = 10000, prefix: str = "shard"):
+		self.dst = dst
+		self.shard_size = shard_size
+		self.prefix = prefix
+
+		self.count = 0
+		self.shard = None
+
+	def __add_member__(self, name: str, payload: bytes):
+		info = tarfile.TarInfo(name)
+		info.size = len(payload)
+		self.shard.addfile(info, io.BytesIO(payload))
+
+	def write(self, name: str, image: Image.Image, label: str):
+		if self.count % self.shard_size == 0:
+			self.close()
+			index = self.count // self.shard_size
+			self.shard = tarfile.open(self.dst / f"{self.prefix}-{index:06d}.tar", "w")
+
+		# WebDataset groups members by the part of the name before the first dot,
+		# so the original file name (which may contain dots) is stored separately
+		key = f"{self.count:09d}"
+		buffer = io.BytesIO()
+		image.save(buffer, format="JPEG", quality=95)
+
+		self.__add_member__(f"{key}.jpg", buffer.getvalue())
+		self.__add_member__(f"{key}.txt", label.encode())
+		self.__add_member__(f"{key}.name", name.encode())
+		self.count += 1
+
+	def close(self):
+		if self.shard is not None:
+			self.shard.close()
+			self.shard = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+
+def read_tar_shard(path: Path):
+	key, sample = None, {}
+	with tarfile.open(path, "r|") as shard:
+		for member in shard:
+			if not member.isfile():
+				continue
+
+			member_key, ext = member.name.split(".", maxsplit=1)
+			if member_key != key and sample:
+				yield sample
+				sample = {}
+
+			key = member_key
+			sample[ext] = shard.extractfile(member).read()
+
+	if sample:
+		yield sample
+
+
+def decode_tar_sample(sample: dict) -> Tuple[str, Image.Image, str]:
+	name = sample["name"].decode()
+	image = Image.open(io.BytesIO(sample["jpg"])).convert("RGB")
+	label = sample["txt"].decode()
+	return name, image, label
+
+
+def read_tar_shards(root: Path, prefix: str = "shard"):
+	for path in sorted(root.glob(f"{prefix}-*.tar")):
+		for sample in read_tar_shard(path):
+			yield decode_tar_sample(sample)
+
+
+class MemmapWriter:
+	def __init__(self, dst: Path, size: Tuple[int, int] | None = (256, 256), prefix: str = "shard"):
+		self.size = size
+		self.index_path = dst / f"{prefix}.json"
+		self.data_path = dst / f"{prefix}.u8"
+
+		self.file = open(self.data_path, "wb")
+		self.items = []
+		self.offset = 0
+
+	def write(self, name: str, image: Image.Image, label: Any):
+		if self.size is not None and image.size != self.size:
+			image = image.resize(self.size)
+
+		array = np.asarray(image.convert("RGB"), dtype=np.uint8)
+		self.file.write(array.tobytes())
+
+		self.items.append({
+			"name": name,
+			"label": label,
+			"offset": self.offset,
+			"shape": array.shape,
+		})
+		self.offset += array.nbytes
+
+	def close(self):
+		if self.file.closed:
+			return
+		self.file.close()
+
+		with open(self.index_path, "w") as f:
+			json.dump({"size": self.size, "items": self.items}, f)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+
+class MemmapReader:
+	def __init__(self, root: Path, prefix: str = "shard"):
+		with open(root / f"{prefix}.json") as f:
+			index = json.load(f)
+
+		self.size = index["size"]
+		self.items = index["items"]
+		if self.items:
+			self.data = np.memmap(root / f"{prefix}.u8", dtype=np.uint8, mode="r")
+		else:
+			self.data = np.empty(0, dtype=np.uint8)
+
+	def __len__(self):
+		return len(self.items)
+
+	def __getitem__(self, idx) -> Tuple[str, np.ndarray, Any]:
+		item = self.items[idx]
+		offset = item["offset"]
+		shape = item["shape"]
+		count = shape[0] * shape[1] * shape[2]
+
+		image = self.data[offset:offset + count].reshape(shape)
+		return item["name"], image, item["label"]
+
+	def __iter__(self):
+		for idx in range(len(self)):
+			yield self[idx]
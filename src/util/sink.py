@@ -0,0 +1,307 @@
+import json
+import sqlite3
+from abc import abstractmethod
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+from typing import List, TYPE_CHECKING
+
+from src.plate.plate import Rect, Symbol, SYMBOLS_EN
+from src.util.files import output_path
+
+if TYPE_CHECKING:
+	from src.plate.batch import PlateBatch
+
+
+@dataclass
+class Result:
+	name: str
+	plate: Rect | None = None
+	symbols: List[Symbol] | None = None
+	elapsed: float | None = None
+
+	def text(self) -> str | None:
+		if self.symbols is None:
+			return None
+		return "".join(SYMBOLS_EN[symbol.id] for symbol in self.symbols)
+
+	def to_dict(self) -> dict:
+		plate = None
+		if self.plate is not None:
+			plate = {
+				"box": list(self.plate.coords()),
+				"score": self.plate.score,
+			}
+
+		symbols = None
+		if self.symbols is not None:
+			symbols = [
+				{
+					"id": symbol.id,
+					"box": list(symbol.rect.coords()),
+					"score": symbol.rect.score,
+				}
+				for symbol in self.symbols
+			]
+
+		return {
+			"name": self.name,
+			"plate": plate,
+			"text": self.text(),
+			"symbols": symbols,
+			"elapsed": self.elapsed,
+		}
+
+	@classmethod
+	def from_dict(cls, result: dict) -> "Result":
+		plate = result["plate"]
+		if plate is not None:
+			plate = Rect(*plate["box"], score=plate["score"])
+
+		symbols = result["symbols"]
+		if symbols is not None:
+			symbols = [Symbol(s["id"], Rect(*s["box"], score=s["score"])) for s in symbols]
+
+		return cls(name=result["name"], plate=plate, symbols=symbols, elapsed=result["elapsed"])
+
+
+class Sink:
+	def __init__(self, dst: Path, buffer: int = 1024):
+		self.dst = dst
+		self.buffer = buffer
+		self.results: List[Result] = []
+		self.batches: List["PlateBatch"] = []
+		self.batched = 0
+
+	@abstractmethod
+	def __flush__(self, results: List[Result]):
+		pass
+
+	def __flush_batches__(self, batches: List["PlateBatch"]):
+		self.__flush__([result for batch in batches for result in batch.results()])
+
+	def write(self, result: Result):
+		self.results.append(result)
+		if len(self.results) >= self.buffer:
+			self.flush()
+
+	def write_batch(self, batch: "PlateBatch"):
+		for result in batch.results():
+			self.write(result)
+
+	def __buffer_batch__(self, batch: "PlateBatch"):
+		# Sinks with a columnar write path keep whole batches until the buffer fills up.
+		# Single results buffered before go out first, batches are flushed before later results to keep the order
+		if self.results:
+			self.flush()
+
+		self.batches.append(batch)
+		self.batched += len(batch)
+		if self.batched >= self.buffer:
+			self.flush()
+
+	def flush(self):
+		if self.batches:
+			self.__flush_batches__(self.batches)
+			self.batches = []
+			self.batched = 0
+
+		if self.results:
+			self.__flush__(self.results)
+			self.results = []
+
+	def close(self):
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+
+class YoloSink(Sink):
+	def __init__(self, dst: Path, buffer: int = 1024):
+		super().__init__(dst, 1)
+
+	def __flush__(self, results: List[Result]):
+		for result in results:
+			path = output_path(self.dst, Path(result.name).with_suffix(".txt"))
+
+			with open(path, "w") as f:
+				if result.symbols is not None:
+					for symbol in result.symbols:
+						ltx, lty, rbx, rby = symbol.rect.coords()
+						f.write(f"{symbol.id} {ltx} {lty} {rbx} {rby}\n")
+				elif result.plate is not None:
+					ltx, lty, rbx, rby = result.plate.coords()
+					f.write(f"0 {ltx} {lty} {rbx} {rby}\n")
+
+
+class JsonlSink(Sink):
+	def __init__(self, dst: Path, buffer: int = 1024):
+		super().__init__(dst, buffer)
+		self.file = open(dst / "results.jsonl", "a")
+
+	def __flush__(self, results: List[Result]):
+		lines = (json.dumps(result.to_dict(), ensure_ascii=False) + "\n" for result in results)
+		self.file.writelines(lines)
+		self.file.flush()
+
+	def close(self):
+		super().close()
+		self.file.close()
+
+
+class SqliteSink(Sink):
+	def __init__(self, dst: Path, buffer: int = 1024):
+		super().__init__(dst, buffer)
+		self.db = sqlite3.connect(dst / "results.sqlite")
+		self.db.execute("PRAGMA journal_mode = WAL")
+		self.db.execute("PRAGMA synchronous = NORMAL")
+		self.db.execute("""
+			CREATE TABLE IF NOT EXISTS results (
+				id INTEGER PRIMARY KEY,
+				name TEXT NOT NULL,
+				ltx REAL, lty REAL, rbx REAL, rby REAL, score REAL,
+				text TEXT,
+				elapsed REAL
+			)
+		""")
+		self.db.execute("""
+			CREATE TABLE IF NOT EXISTS symbols (
+				result_id INTEGER NOT NULL REFERENCES results(id),
+				position INTEGER NOT NULL,
+				id INTEGER NOT NULL,
+				ltx REAL, lty REAL, rbx REAL, rby REAL, score REAL
+			)
+		""")
+
+	def __flush__(self, results: List[Result]):
+		with self.db:
+			row = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM results").fetchone()
+			next_id = row[0] + 1
+
+			rows = []
+			symbols = []
+			for i, result in enumerate(results, next_id):
+				plate = result.plate
+				coords = plate.coords() if plate is not None else (None,) * 4
+				score = plate.score if plate is not None else None
+				rows.append((i, result.name, *coords, score, result.text(), result.elapsed))
+
+				for position, symbol in enumerate(result.symbols or []):
+					symbols.append((i, position, symbol.id, *symbol.rect.coords(), symbol.rect.score))
+
+			self.db.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+			self.db.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)", symbols)
+
+	def write_batch(self, batch: "PlateBatch"):
+		self.__buffer_batch__(batch)
+
+	def __flush_batches__(self, batches: List["PlateBatch"]):
+		# Rows are built from whole columns, NaN marking missing values becomes NULL
+		def column(values):
+			return [None if v != v else v for v in values.tolist()]
+
+		with self.db:
+			row = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM results").fetchone()
+			next_id = row[0] + 1
+
+			for batch in batches:
+				ids = list(range(next_id, next_id + len(batch)))
+				next_id += len(batch)
+
+				boxes = batch.plate_boxes.T
+				rows = zip(
+					ids, batch.names, *(column(b) for b in boxes), column(batch.plate_scores), batch.texts(),
+					column(batch.elapsed),
+				)
+
+				counts = batch.counts.tolist()
+				positions = [position for count in counts for position in range(count)]
+				owners = [i for i, count in zip(ids, counts) for _ in range(count)]
+				symbol_boxes = batch.symbol_boxes.T
+				symbols = zip(
+					owners, positions, batch.symbol_ids.tolist(),
+					*(b.tolist() for b in symbol_boxes), column(batch.symbol_scores),
+				)
+
+				self.db.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+				self.db.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)", symbols)
+
+	def close(self):
+		super().close()
+		self.db.close()
+
+
+class ParquetSink(Sink):
+	def __init__(self, dst: Path, buffer: int = 65536):
+		super().__init__(dst, buffer)
+		try:
+			import pyarrow
+			import pyarrow.parquet
+		except ImportError:
+			raise ImportError("ParquetSink requires pyarrow: pip install pyarrow")
+
+		self.pa = pyarrow
+		box = pyarrow.list_(pyarrow.float32(), 4)
+		self.schema = pyarrow.schema([
+			("name", pyarrow.string()),
+			("plate_box", box),
+			("plate_score", pyarrow.float32()),
+			("text", pyarrow.string()),
+			("symbol_ids", pyarrow.list_(pyarrow.uint8())),
+			("symbol_boxes", pyarrow.list_(box)),
+			("symbol_scores", pyarrow.list_(pyarrow.float32())),
+			("elapsed", pyarrow.float64()),
+		])
+		self.writer = pyarrow.parquet.ParquetWriter(dst / "results.parquet", self.schema)
+
+	def __flush__(self, results: List[Result]):
+		columns = {name: [] for name in self.schema.names}
+		for result in results:
+			plate = result.plate
+			symbols = result.symbols
+			columns["name"].append(result.name)
+			columns["plate_box"].append(list(plate.coords()) if plate is not None else None)
+			columns["plate_score"].append(plate.score if plate is not None else None)
+			columns["text"].append(result.text())
+			columns["symbol_ids"].append([s.id for s in symbols] if symbols is not None else None)
+			columns["symbol_boxes"].append([list(s.rect.coords()) for s in symbols] if symbols is not None else None)
+			columns["symbol_scores"].append([s.rect.score for s in symbols] if symbols is not None else None)
+			columns["elapsed"].append(result.elapsed)
+
+		table = self.pa.table(columns, schema=self.schema)
+		self.writer.write_table(table)
+
+	def write_batch(self, batch: "PlateBatch"):
+		self.__buffer_batch__(batch)
+
+	def __flush_batches__(self, batches: List["PlateBatch"]):
+		# One table for all buffered batches, so the file gets row groups of the buffer size
+		table = self.pa.concat_tables([batch.to_arrow().cast(self.schema) for batch in batches])
+		self.writer.write_table(table.combine_chunks())
+
+	def close(self):
+		super().close()
+		self.writer.close()
+
+
+class SinkType(StrEnum):
+	YOLO = "yolo"
+	JSONL = "jsonl"
+	SQLITE = "sqlite"
+	PARQUET = "parquet"
+
+	def to_cls(self):
+		match self:
+			case SinkType.YOLO:
+				return YoloSink
+			case SinkType.JSONL:
+				return JsonlSink
+			case SinkType.SQLITE:
+				return SqliteSink
+			case SinkType.PARQUET:
+				return ParquetSink
+
@@ -0,0 +1,72 @@
+import json
+import time
+from pathlib import Path
+
+import torch
+from torch import nn
+
+from src.util.dfine import SLIM_FORMAT, select_state
+from src.util.digest import hash_file
+
+SLIM_DTYPES = {
+	"fp32": torch.float32,
+	"fp16": torch.float16,
+	"bf16": torch.bfloat16,
+}
+
+
+def cast_state(model: nn.Module, dtype: torch.dtype) -> dict:
+	# Only parameters are stored in reduced precision, buffers such as anchors keep their precision
+	parameters = {name for name, _ in model.named_parameters()}
+	return {
+		key: value.to(dtype) if key in parameters and value.is_floating_point() else value
+		for key, value in model.state_dict().items()
+	}
+
+
+def state_bytes(state: dict) -> int:
+	return sum(value.numel() * value.element_size() for value in state.values())
+
+
+def slim_checkpoint(config: Path, checkpoint: Path, dst: Path, dtype: str = "fp16") -> dict:
+	from model.DFINE.src.core.yaml_config import YAMLConfig
+
+	cfg = YAMLConfig(cfg_path=str(config), resume=str(checkpoint))
+	if "HGNetv2" in cfg.yaml_cfg:
+		cfg.yaml_cfg["HGNetv2"]["pretrained"] = False
+
+	full = torch.load(checkpoint, map_location="cpu")
+	source, state = select_state(full)
+	epoch = full.get("last_epoch")
+	del full
+
+	# Reparameterization is done once here instead of on every node at start-up
+	cfg.model.load_state_dict(state)
+	model = cfg.model.deploy()
+	slim = cast_state(model, SLIM_DTYPES[dtype])
+
+	manifest = {
+		"format": SLIM_FORMAT,
+		"config": str(config),
+		"checkpoint": str(checkpoint),
+		"checkpoint_hash": hash_file(checkpoint),
+		"checkpoint_bytes": checkpoint.stat().st_size,
+		"source": source,
+		"epoch": epoch,
+		"dtype": dtype,
+		"eval_spatial_size": cfg.yaml_cfg.get("eval_spatial_size"),
+		"parameters": sum(parameter.numel() for parameter in model.parameters()),
+		"weight_bytes": state_bytes(slim),
+		"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+		"torch": torch.__version__,
+	}
+
+	dst.parent.mkdir(parents=True, exist_ok=True)
+	torch.save({"format": SLIM_FORMAT, "manifest": manifest, "model": slim}, dst)
+	manifest["bytes"] = dst.stat().st_size
+
+	# The manifest is also written next to the weights, so it can be read without torch
+	with open(dst.with_suffix(".json"), "w") as f:
+		json.dump(manifest, f, indent=2)
+
+	return manifest